@@ -1,15 +1,25 @@
 #!/usr/bin/env python3
-import gi, os, pathlib, subprocess, shutil, json, datetime, shlex
+import time
+STARTED = time.perf_counter()  # start of the startup measurement (module load to first painted frame)
+import os, sys, pathlib, threading
+if __name__ == '__main__' and len(sys.argv) > 1 and sys.argv[1].startswith('--'):
+    # --list, --search, --hide, ... never need GTK: ask the running window, or scan headless if there is none
+    import launcher_cli
+    if launcher_cli.command_option(sys.argv[1]): sys.exit(launcher_cli.main_from_gui(sys.argv[1:]))
+import gi
+from collections import OrderedDict
 from typing import Optional
 
 gi.require_version('Gtk', '4.0')
 gi.require_version('Adw', '1')
-from gi.repository import Gtk, Gio, GLib, GObject, Adw
+gi.require_version('GdkPixbuf', '2.0')  # imported by the icon workers when first needed
+from gi.repository import Gtk, Gdk, Gio, GLib, GObject, Pango, Adw
 
-APP_ID = 'com.example.AppDrawerManager'
-CUSTOM_MARKER_KEY = 'X-Custom-Added'
-CUSTOM_MARKER_VALUE = '1'
-LOCAL_APPS = pathlib.Path.home() / '.local/share/applications'
+import launcher_core as core
+import launcher_cli
+from launcher_core import (APP_ID, DesktopEntry, OverlayRecord, LauncherIndex, DuplicateLauncherError, ENTRY_CACHE, ICON_STORE,
+                           HEALTH, LAUNCHES, PROFILE, SYSTEM_APP_DIRS, WRAPPERS, build_overlay_index, resolve_overlay, load_snapshot,
+                           save_snapshot)
 
 CSS = b"""
 window, dialog { background-color: @theme_base_color; }
@@ -20,88 +30,276 @@ window, dialog { background-color: @theme_base_color; }
 .heading { font-weight: 600; font-size: 1.1em; }
 """
 
-SYSTEM_APP_DIRS = [
-    pathlib.Path.home()/'.local/share/applications',
-    pathlib.Path('/usr/local/share/applications'),
-    pathlib.Path('/usr/share/applications'),
-    pathlib.Path('/var/lib/flatpak/exports/share/applications'),
-    pathlib.Path.home()/'.local/share/flatpak/exports/share/applications'
-]
-
-class DesktopEntry:
-    def __init__(self, path: pathlib.Path):
-        self.path = path
-        self.data = self._parse()
-
-    def _parse(self):
-        d = {}
-        try:
-            with self.path.open('r', encoding='utf-8') as f:
-                section = None
-                for line in f:
-                    line = line.strip('\n')
-                    if not line or line.startswith('#'): continue
-                    if line.startswith('[') and line.endswith(']'):
-                        section = line[1:-1]
-                        continue
-                    if '=' in line and section == 'Desktop Entry':
-                        k,v = line.split('=',1)
-                        d[k.strip()] = v.strip()
-        except Exception as e:
-            print('Parse error', e)
-        return d
+SCAN_BATCH_SIZE = 200
+MONITOR_COALESCE_MS = 250
+FLUSH_MS = 2000  # icon GC, icon cache and desktop database refresh run once per burst of edits
+ICON_SIZE = 32
+ICON_CACHE_SIZE = 512
+ICON_WORKERS = 2
+ICON_PLACEHOLDER = 'application-x-executable-symbolic'
+LAUNCH_POLL_MS = 50  # first window probe interval while timing a launch; grows by half each poll ...
+LAUNCH_POLL_MAX_MS = 500  # ... up to this
+LAUNCH_TIMEOUT_S = 60
+
+class IconLoader:
+    """Row icons decoded off the main thread into a bounded LRU of pre-scaled Gdk.Textures.
+
+    Keys are (path, mtime, pixel size). Icon names are resolved through the theme once (an index lookup, no
+    decoding) and then loaded like paths. Requests for an icon that is already loading share the one decode.
+    """
+    def __init__(self, size: int = ICON_SIZE, capacity: int = ICON_CACHE_SIZE):
+        self.size = size
+        self.capacity = capacity
+        self.textures: OrderedDict = OrderedDict()  # key -> Gdk.Texture, or None if the file could not be decoded
+        self.waiting: dict[tuple, list] = {}  # (path, pixel size) -> callbacks for the load in flight
+        self.files: dict[tuple, tuple] = {}  # (path, pixel size) -> current key, as last stat'ed by a worker
+        self.names: dict[tuple, object] = {}  # (icon name, scale) -> file path, theme paintable (no file) or None
+        self._pool = None  # created with the first load
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._pool = ThreadPoolExecutor(max_workers=ICON_WORKERS, thread_name_prefix='icons')
+        return self._pool
+
+    def forget_files(self):
+        """Re-check icon files for changes on their next request (decoded textures are kept if unchanged)."""
+        self.files.clear(); self.names.clear()
+
+    def _resolve_name(self, widget: Gtk.Widget, icon: str, scale: int):
+        theme = Gtk.IconTheme.get_for_display(widget.get_display())
+        if not theme.has_icon(icon): return None
+        paintable = theme.lookup_icon(icon, None, self.size, scale, Gtk.TextDirection.NONE, 0)
+        f = paintable.get_file()
+        if f is None or icon.endswith('-symbolic'): return paintable  # resources; symbolic icons need recoloring
+        return f.get_path() or paintable
+
+    def request(self, widget: Gtk.Widget, icon: str, callback) -> Optional[Gdk.Paintable]:
+        """The cached paintable for icon, or None (show a placeholder). If a load was started, or one is
+        already in flight, callback(paintable) runs on the main loop once it is done."""
+        scale = widget.get_scale_factor(); px = self.size * scale
+        path = icon
+        if not os.path.isabs(icon):
+            path = self.names.get((icon, scale))
+            if path is None:
+                path = self._resolve_name(widget, icon, scale)
+                if path is not None: self.names[(icon, scale)] = path  # missing names are retried (new stored icons)
+            if not isinstance(path, str): return path
+        key = self.files.get((path, px))
+        if key is not None and key in self.textures:
+            self.textures.move_to_end(key)
+            return self.textures[key]
+        waiting = self.waiting.get((path, px))
+        if waiting is not None:
+            waiting.append(callback); return None
+        self.waiting[(path, px)] = [callback]
+        self.pool.submit(self._load, path, px, set(self.textures))
+        return None
 
-    def is_custom(self):
-        return self.data.get(CUSTOM_MARKER_KEY) == CUSTOM_MARKER_VALUE
+    def _load(self, path: str, px: int, cached: set):
+        # Worker thread: stat + decode. Unchanged files already in the cache are not decoded again.
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime = 0
+        key = (path, mtime, px); texture = None
+        if key not in cached and mtime:
+            try:
+                from gi.repository import GdkPixbuf
+                pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(path, px, px, True)
+                texture = Gdk.Texture.new_for_pixbuf(pixbuf)
+            except Exception as e:
+                print('Icon load error', e)
+        GLib.idle_add(self._loaded, path, px, key, key in cached, texture)
+
+    def _loaded(self, path: str, px: int, key: tuple, reused: bool, texture):
+        if reused and key not in self.textures:  # evicted while the worker was checking it
+            self.pool.submit(self._load, path, px, set()); return False
+        self.files[(path, px)] = key
+        if not reused:
+            self.textures[key] = texture
+            while len(self.textures) > self.capacity:
+                self.textures.popitem(last=False)
+        self.textures.move_to_end(key)
+        for cb in self.waiting.pop((path, px), ()):
+            cb(self.textures[key])
+        return False
 
-    def is_local(self):
+class LaunchTimer:
+    """Runs launchers through Gio.DesktopAppInfo and records spawn -> first mapped window (or process exit for
+    terminal apps) in the launch history."""
+    def __init__(self, parent_win: 'AppWindow'):
+        self.parent_win = parent_win
+        self.children_lock = threading.Lock()
+        self.children = (0.0, {})  # (taken at, /proc child map): one /proc pass per tick for all running probes
+
+    def launch(self, item: 'EntryItem'):
+        entry = item.entry
+        info = Gio.DesktopAppInfo.new_from_filename(str(entry.path))
+        if info is None:
+            self._toast('Cannot run: hidden or invalid launcher'); return
+        terminal = entry.data.get('Terminal', '').lower() == 'true'
+        state = {'done': False, 'id': item.desktop_id, 'name': entry.display_name(), 'exec': entry.data.get('Exec', '')}
+        started = time.perf_counter()
+        def on_pid(_info, pid, *_):
+            GLib.child_watch_add(GLib.PRIORITY_DEFAULT, pid, self._exited, state, started)
+            if not terminal:
+                threading.Thread(target=self._probe, args=(pid, state, started), daemon=True).start()
         try:
-            return str(self.path).startswith(str(LOCAL_APPS))
-        except Exception:
-            return False
+            info.launch_uris_as_manager([], self.parent_win.get_display().get_app_launch_context(),
+                                        GLib.SpawnFlags.SEARCH_PATH | GLib.SpawnFlags.DO_NOT_REAP_CHILD, None, None, on_pid, None)
+        except GLib.Error as e:
+            self._toast(f'Launch failed: {e.message}')
+
+    def _probe(self, pid: int, state: dict, started: float):
+        # Worker: poll the window list until a window of the launched process tree is mapped
+        known = core.window_pids()  # windows that were there before ours cannot be it
+        if known is None:
+            GLib.idle_add(self._give_up, state, 'Launched (window timing needs wmctrl on X11; not available on Wayland)'); return
+        interval = LAUNCH_POLL_MS
+        while not state['done'] and time.perf_counter() - started < LAUNCH_TIMEOUT_S:
+            time.sleep(interval / 1000)
+            interval = min(LAUNCH_POLL_MAX_MS, interval * 1.5)
+            pids = core.window_pids()
+            if pids is None:
+                GLib.idle_add(self._give_up, state, 'Launched (window list no longer available)'); return
+            new = pids - known
+            if new and (pid in new or new & core.process_tree(pid, self._process_children())):
+                GLib.idle_add(self._finish, state, 'window', time.perf_counter() - started); return
+        GLib.idle_add(self._give_up, state, f'{state["name"]}: no window after {LAUNCH_TIMEOUT_S} s')
+
+    def _process_children(self) -> dict[int, list[int]]:
+        # /proc is walked only when a new window appeared, and at most once per tick across concurrent launches
+        with self.children_lock:
+            taken, children = self.children
+            if time.perf_counter() - taken > LAUNCH_POLL_MS / 1000:
+                self.children = (time.perf_counter(), core.process_children()); children = self.children[1]
+            return children
+
+    def _exited(self, pid: int, status: int, state: dict, started: float):
+        GLib.spawn_close_pid(pid)
+        elapsed = time.perf_counter() - started
+        try: code = os.waitstatus_to_exitcode(status)
+        except ValueError: code = status
+        if code != 0: self._give_up(state, f'{state["name"]} exited with status {code}')
+        else: self._finish(state, 'exit', elapsed)
+
+    def _give_up(self, state: dict, msg: str):
+        if state['done']: return False
+        state['done'] = True
+        self._toast(msg)
+        return False
 
-    def display_name(self):
-        return self.data.get('Name', self.path.name)
+    def _finish(self, state: dict, outcome: str, elapsed: float):
+        if state['done']: return False
+        state['done'] = True
+        ms = elapsed * 1000
+        LAUNCHES.record(state['id'], ms, outcome, state['exec'])
+        summary = LAUNCHES.summary(state['id'])
+        msg = f"{state['name']}: {'first window' if outcome == 'window' else 'exited'} after {ms:.0f} ms"
+        if summary['runs'] > 1: msg += f" (median {summary['median_ms']:.0f} ms over {summary['runs']} runs)"
+        self._toast(msg)
+        self.parent_win.item_changed(state['id'])  # refresh the Run tooltip
+        return False
 
-    def icon_name(self):
-        return self.data.get('Icon')
+    def _toast(self, msg: str):
+        self.parent_win.toast_overlay.add_toast(Adw.Toast.new(msg))
 
-    def is_hidden(self):
-        val_hidden = self.data.get('Hidden','').lower() == 'true'
-        val_nodisplay = self.data.get('NoDisplay','').lower() == 'true'
-        return val_hidden or val_nodisplay
+class EntryItem(GObject.Object):
+    """List model item wrapping a resolved OverlayRecord with its precomputed filter/sort keys."""
+    __gtype_name__ = 'EntryItem'
+    def __init__(self, overlay: OverlayRecord):
+        super().__init__()
+        self.overlay = overlay
+        self.entry = entry = overlay.entry
+        self.desktop_id = overlay.desktop_id
+        self.sort_key = entry.display_name().lower()
+        self.custom_local = entry.is_custom() and entry.is_local()
+        self.problems: list[str] = []  # filled in by the background health check
+        self.facets = core.record_facets(overlay)  # category/source/state values for the Filter popover
 
 class AppListRow(Adw.ActionRow):
+    """Recycled row: widgets are built once per visible slot of the ListView and rebound to entries while scrolling."""
     __gtype_name__ = 'AppListRow'
-    def __init__(self, entry: DesktopEntry, parent_win: 'AppWindow'):
+    def __init__(self, parent_win: 'AppWindow'):
         super().__init__()
-        self.entry = entry
+        self.entry: Optional[DesktopEntry] = None
+        self.item: Optional[EntryItem] = None
         self.parent_win = parent_win
-        self.set_title(entry.display_name())
-        if entry.icon_name():
-            self.add_prefix(Gtk.Image.new_from_icon_name(entry.icon_name()))
+        self.icon = Gtk.Image(pixel_size=ICON_SIZE); self.add_prefix(self.icon)
+        self.icon_request: Optional[str] = None
         # State badges
-        if entry.is_custom():
-            if parent_win.has_system_counterpart(entry.path.name):
-                badge = Gtk.Label(label='OVERRIDE'); badge.add_css_class('warning'); self.add_prefix(badge)
-            if entry.is_hidden():
-                hidden_badge = Gtk.Label(label='HIDDEN'); hidden_badge.add_css_class('danger'); self.add_prefix(hidden_badge)
-        # Action buttons
-        if entry.is_custom():
-            # Edit
-            edit_btn = Gtk.Button.new_from_icon_name('document-edit-symbolic'); edit_btn.set_tooltip_text('Edit'); edit_btn.connect('clicked', self.on_edit); self.add_suffix(edit_btn)
-            # Unhide if hidden
-            if entry.is_hidden():
-                unhide_btn = Gtk.Button.new_from_icon_name('view-refresh-symbolic'); unhide_btn.set_tooltip_text('Unhide'); unhide_btn.connect('clicked', self.on_unhide); self.add_suffix(unhide_btn)
-            # Revert override if there is system counterpart
-            if parent_win.has_system_counterpart(entry.path.name):
-                revert_btn = Gtk.Button.new_from_icon_name('edit-undo-symbolic'); revert_btn.set_tooltip_text('Revert override'); revert_btn.connect('clicked', self.on_revert); self.add_suffix(revert_btn)
-            # Delete (only removes local file)
-            rm_btn = Gtk.Button.new_from_icon_name('user-trash-symbolic'); rm_btn.add_css_class('destructive-action'); rm_btn.set_tooltip_text('Delete'); rm_btn.connect('clicked', self.on_remove); self.add_suffix(rm_btn)
-        else:
-            # Non-custom system/flatpak entry: allow Hide + Override & Edit
-            hide_btn = Gtk.Button.new_from_icon_name('window-close-symbolic'); hide_btn.set_tooltip_text('Hide (create Hidden override)'); hide_btn.connect('clicked', self.on_hide); self.add_suffix(hide_btn)
-            override_btn = Gtk.Button.new_from_icon_name('document-edit-symbolic'); override_btn.set_tooltip_text('Override & Edit (creates local copy)'); override_btn.connect('clicked', self.on_override_edit); self.add_suffix(override_btn)
+        self.override_badge = Gtk.Label(label='OVERRIDE'); self.override_badge.add_css_class('warning'); self.add_prefix(self.override_badge)
+        self.hidden_badge = Gtk.Label(label='HIDDEN'); self.hidden_badge.add_css_class('danger'); self.add_prefix(self.hidden_badge)
+        self.orphan_badge = Gtk.Label(label='ORPHANED'); self.orphan_badge.add_css_class('warning'); self.add_prefix(self.orphan_badge)
+        self.orphan_badge.set_tooltip_text('Overrides an application that is no longer installed')
+        self.broken_badge = Gtk.Label(label='BROKEN'); self.broken_badge.add_css_class('danger'); self.add_prefix(self.broken_badge)
+        self.run_btn = self._add_button('media-playback-start-symbolic', 'Run', self.on_run)
+        # Action buttons (custom entries)
+        self.edit_btn = self._add_button('document-edit-symbolic', 'Edit', self.on_edit)
+        self.unhide_btn = self._add_button('view-refresh-symbolic', 'Unhide', self.on_unhide)
+        self.revert_btn = self._add_button('edit-undo-symbolic', 'Revert override', self.on_revert)
+        self.rm_btn = self._add_button('user-trash-symbolic', 'Delete', self.on_remove); self.rm_btn.add_css_class('destructive-action')
+        # Action buttons (non-custom system/flatpak entries): Hide + Override & Edit
+        self.hide_btn = self._add_button('window-close-symbolic', 'Hide (create Hidden override)', self.on_hide)
+        self.override_btn = self._add_button('document-edit-symbolic', 'Override & Edit (creates local copy)', self.on_override_edit)
+
+    def _add_button(self, icon_name: str, tooltip: str, handler) -> Gtk.Button:
+        btn = Gtk.Button.new_from_icon_name(icon_name); btn.set_tooltip_text(tooltip); btn.set_valign(Gtk.Align.CENTER)
+        btn.connect('clicked', handler); self.add_suffix(btn)
+        return btn
+
+    def bind(self, item: EntryItem):
+        # Everything here comes from the item's overlay record: no filesystem calls per row
+        entry = self.entry = item.entry
+        self.item = item
+        self.set_title(entry.display_name())
+        self._bind_icon(entry.icon_name())
+        custom = entry.is_custom(); hidden = entry.is_hidden()
+        overridden = custom and item.overlay.is_override()
+        self.override_badge.set_visible(overridden)
+        self.hidden_badge.set_visible(custom and hidden)
+        self.orphan_badge.set_visible(item.overlay.is_orphaned())
+        self.broken_badge.set_visible(bool(item.problems))
+        self.broken_badge.set_tooltip_text('\n'.join(item.problems) or None)
+        self.run_btn.set_visible(not hidden)
+        self.run_btn.set_tooltip_text(self._run_tooltip(item.desktop_id))
+        self.edit_btn.set_visible(custom)
+        self.unhide_btn.set_visible(custom and hidden)
+        self.revert_btn.set_visible(overridden)
+        self.rm_btn.set_visible(custom)
+        self.hide_btn.set_visible(not custom)
+        self.override_btn.set_visible(not custom)
+
+    @staticmethod
+    def _run_tooltip(desktop_id: str) -> str:
+        summary = LAUNCHES.summary(desktop_id)
+        if summary is None: return 'Run (and time its startup)'
+        lines = [f"Run · last {summary['last_ms']:.0f} ms, median {summary['median_ms']:.0f} ms over {summary['runs']} runs"]
+        if len(summary['by_exec']) > 1:
+            lines += [f"{s['median_ms']:.0f} ms ({s['runs']}×): {e}" for e, s in summary['by_exec'].items()]
+        return '\n'.join(lines)
+
+    def _bind_icon(self, icon: Optional[str]):
+        # Placeholder until the loader has the texture; a recycled row ignores loads for its previous entry
+        self.icon_request = icon
+        self.icon.set_visible(bool(icon))
+        if not icon: return
+        paintable = self.parent_win.icons.request(self, icon, lambda p, icon=icon: self._icon_ready(icon, p))
+        if paintable is not None: self.icon.set_from_paintable(paintable)
+        else: self.icon.set_from_icon_name(ICON_PLACEHOLDER)
+
+    def _icon_ready(self, icon: str, paintable):
+        if self.icon_request != icon: return
+        if paintable is not None: self.icon.set_from_paintable(paintable)
+
+    def unbind(self):
+        self.entry = self.item = None
+        self.icon_request = None
+
+    def on_run(self, *_):
+        if self.item is not None: self.parent_win.launcher.launch(self.item)
 
     def on_edit(self, *_):
         EditDesktopWindow(self.get_ancestor(AppWindow), self.entry).present()
@@ -110,17 +308,9 @@ class AppListRow(Adw.ActionRow):
         win = self.get_ancestor(AppWindow)
         if not win: return
         try:
-            contents = self.entry.path.read_text(encoding='utf-8')
-            if f'{CUSTOM_MARKER_KEY}=' not in contents:
-                contents += f'\n{CUSTOM_MARKER_KEY}={CUSTOM_MARKER_VALUE}\n'
-            target = LOCAL_APPS / self.entry.path.name
-            base = target.stem; counter = 1
-            while target.exists():
-                target = LOCAL_APPS / f"{base}-{counter}.desktop"; counter += 1
-            LOCAL_APPS.mkdir(parents=True, exist_ok=True)
-            target.write_text(contents, encoding='utf-8')
+            target = core.clone_entry(self.entry)
             win.toast_overlay.add_toast(Adw.Toast.new('Cloned'))
-            win.reload_list()
+            win.refresh_ids([target.name])
             # Open edit on cloned one
             cloned_entry = DesktopEntry(target)
             GLib.idle_add(lambda: EditDesktopWindow(win, cloned_entry).present())
@@ -137,75 +327,48 @@ class AppListRow(Adw.ActionRow):
         win = self.get_ancestor(AppWindow)
         if not win: return
         try:
-            contents = self.entry.path.read_text(encoding='utf-8')
-            if f'{CUSTOM_MARKER_KEY}=' not in contents:
-                contents += f'\n{CUSTOM_MARKER_KEY}={CUSTOM_MARKER_VALUE}\n'
-            target = LOCAL_APPS / self.entry.path.name
-            base = target.stem; counter = 1
-            while target.exists():
-                # If an existing override (already custom) then just open
-                existing_entry = DesktopEntry(target)
-                if existing_entry.is_custom():
-                    EditDesktopWindow(win, existing_entry).present(); return
-                target = LOCAL_APPS / f"{base}-{counter}.desktop"; counter += 1
-            LOCAL_APPS.mkdir(parents=True, exist_ok=True)
-            target.write_text(contents, encoding='utf-8')
-            win.toast_overlay.add_toast(Adw.Toast.new('Override created'))
-            win.reload_list()
+            target, created = core.override_entry(self.entry)
             overridden = DesktopEntry(target)
+            if not created:
+                # Existing override (already custom): just open it
+                EditDesktopWindow(win, overridden).present(); return
+            win.toast_overlay.add_toast(Adw.Toast.new('Override created'))
+            win.refresh_ids([target.name])
             GLib.idle_add(lambda: EditDesktopWindow(win, overridden).present())
         except Exception as e:
             win.toast_overlay.add_toast(Adw.Toast.new(f'Override failed: {e}'))
 
     def on_revert(self, *_):
         # Delete local override only (keep system entry)
+        entry = self.entry
         try:
-            if self.entry.path.exists():
-                self.entry.path.unlink()
+            core.remove_entry(entry)
             self.parent_win.toast_overlay.add_toast(Adw.Toast.new('Override reverted'))
         except Exception as e:
             self.parent_win.toast_overlay.add_toast(Adw.Toast.new(f'Revert failed: {e}'))
-        self.parent_win.reload_list()
+        self.parent_win.refresh_ids([entry.path.name])
 
     def on_hide(self, *_):
         """Create a local override with Hidden=true (acts like delete)."""
         win = self.get_ancestor(AppWindow)
         if not win: return
         try:
-            contents = self.entry.path.read_text(encoding='utf-8')
-            if '[Desktop Entry]' not in contents:
-                win.toast_overlay.add_toast(Adw.Toast.new('Invalid desktop file'))
-                return
-            if 'Hidden=' in contents or 'NoDisplay=' in contents:
-                # Already has hidden marker upstream; still clone to ensure local override
-                pass
-            if f'{CUSTOM_MARKER_KEY}=' not in contents:
-                contents += f'\n{CUSTOM_MARKER_KEY}={CUSTOM_MARKER_VALUE}'
-            if 'Hidden=' not in contents and 'NoDisplay=' not in contents:
-                contents += '\nHidden=true'
-            target = LOCAL_APPS / self.entry.path.name
-            base = target.stem; counter = 1
-            while target.exists() and not DesktopEntry(target).is_custom():
-                target = LOCAL_APPS / f"{base}-{counter}.desktop"; counter += 1
-            LOCAL_APPS.mkdir(parents=True, exist_ok=True)
-            target.write_text(contents + '\n', encoding='utf-8')
+            target = core.hide_entry(self.entry)
             win.toast_overlay.add_toast(Adw.Toast.new('Hidden (override created)'))
-            win.reload_list()
+            win.refresh_ids([target.name])
         except Exception as e:
             win.toast_overlay.add_toast(Adw.Toast.new(f'Hide failed: {e}'))
 
     def on_unhide(self, *_):
         win = self.get_ancestor(AppWindow)
         if not win: return
+        entry = self.entry
         try:
-            lines = self.entry.path.read_text(encoding='utf-8').splitlines()
-            filtered = [l for l in lines if not l.startswith('Hidden=') and not l.startswith('NoDisplay=')]
-            if filtered == lines:
+            if not core.unhide_entry(entry):
                 win.toast_overlay.add_toast(Adw.Toast.new('Not hidden'))
                 return
-            self.entry.path.write_text('\n'.join(filtered)+'\n', encoding='utf-8')
             win.toast_overlay.add_toast(Adw.Toast.new('Unhidden'))
-            win.reload_list()
+            win.refresh_ids([entry.path.name])
         except Exception as e:
             win.toast_overlay.add_toast(Adw.Toast.new(f'Unhide failed: {e}'))
 
@@ -234,7 +397,7 @@ class AddDesktopWindow(Gtk.Window):
         # Wrapper selection
         wrapper_label = Gtk.Label(label='Wrapper:', xalign=0)
         self.wrapper_combo = Gtk.ComboBoxText()
-        for opt in ['Auto','Direct','python3','python','bash','sh','node']:
+        for opt in WRAPPERS:
             self.wrapper_combo.append_text(opt)
         self.wrapper_combo.set_active(0)
         wrapper_box = Gtk.Box(spacing=6)
@@ -292,48 +455,18 @@ class AddDesktopWindow(Gtk.Window):
             if not self.name_entry.get_text():
                 stem = pathlib.Path(self.exec_path).stem.replace('_',' ').title()
                 self.name_entry.set_text(stem)
-            # Auto choose wrapper if extension suggests
+            # Auto choose wrapper if the shebang or extension suggests one (versioned interpreters stay on Auto)
             if self.wrapper_combo.get_active_text() == 'Auto':
-                ext = pathlib.Path(self.exec_path).suffix.lower()
-                if ext == '.py': self.wrapper_combo.set_active(self._wrapper_index('python3'))
-                elif ext in ('.sh','.bash'): self.wrapper_combo.set_active(self._wrapper_index('bash'))
-                elif ext == '.js': self.wrapper_combo.set_active(self._wrapper_index('node'))
+                wrapper = core.auto_wrapper(self.exec_path)
+                if wrapper != 'Direct': self.wrapper_combo.set_active(self._wrapper_index(wrapper))
 
     def _wrapper_index(self, name:str)->int:
-        for i,opt in enumerate(['Auto','Direct','python3','python','bash','sh','node']):
-            if opt == name: return i
-        return 0
+        return WRAPPERS.index(name) if name in WRAPPERS else 0
 
     def _build_exec_command(self)->str:
         if not self.exec_path:
             return ''
-        wrapper = self.wrapper_combo.get_active_text() or 'Auto'
-        path = self.exec_path
-        raw_args = self.args_entry.get_text().strip()
-        try:
-            arg_tokens = shlex.split(raw_args) if raw_args else []
-        except Exception:
-            # fallback treat as single arg string
-            arg_tokens = [raw_args] if raw_args else []
-        parts: list[str] = []
-        if wrapper == 'Auto':
-            ext = pathlib.Path(path).suffix.lower()
-            if os.access(path, os.X_OK) and ext not in ('.py','.sh','.bash','.js'):
-                parts.append(path)
-            elif ext == '.py':
-                parts.extend(['python3', path])
-            elif ext in ('.sh','.bash'):
-                parts.extend(['bash', path])
-            elif ext == '.js':
-                parts.extend(['node', path])
-            else:
-                parts.append(path)
-        elif wrapper == 'Direct':
-            parts.append(path)
-        else:
-            parts.extend([wrapper, path])
-        parts.extend(arg_tokens)
-        return ' '.join(shlex.quote(p) for p in parts)
+        return core.build_exec_command(self.exec_path, self.wrapper_combo.get_active_text() or 'Auto', self.args_entry.get_text())
 
     def on_create(self, *_):
         if not self.exec_path:
@@ -344,79 +477,32 @@ class AddDesktopWindow(Gtk.Window):
         exec_cmd = self._build_exec_command()
         if not exec_cmd:
             self._toast('Exec could not be built'); return
-        # Duplicate detection by Exec command
-        existing_custom = self.parent_win.find_custom_by_exec(exec_cmd)
-        if existing_custom:
-            self._toast('Already exists – opening for edit')
-            EditDesktopWindow(self.parent_win, existing_custom).present()
-            self.close(); return
-        existing_system = self.parent_win.find_system_by_exec(exec_cmd)
-        if existing_system:
-            self._toast('System app already runs this – use Override & Edit from All Apps')
-            return
-        # Also prevent duplicate name file (same sanitized base)
-        fname_candidate = ''.join(c for c in name if c.isalnum() or c in ('-','_')).replace(' ','') or 'custom'
-        possible = LOCAL_APPS / f"{fname_candidate}.desktop"
-        if possible.exists():
-            try:
-                existing_entry = DesktopEntry(possible)
-                if existing_entry.is_custom():
-                    self._toast('Name already used – opening existing')
-                    EditDesktopWindow(self.parent_win, existing_entry).present(); self.close(); return
-            except Exception:
-                pass
-        # Proceed with creation
         # possibly mark executable
         if self.exec_perm_switch.get_active():
-            try: st = os.stat(self.exec_path); os.chmod(self.exec_path, st.st_mode | 0o111)
+            try: core.make_executable(self.exec_path)
             except Exception: pass
-        comment = self.comment_entry.get_text().strip()
-        icon = self.icon_entry.get_text().strip()
-        categories = self.categories_entry.get_text().strip()
-        terminal = self.terminal_switch.get_active()
-        fname = ''.join(c for c in name if c.isalnum() or c in ('-','_')).replace(' ','') or 'custom'
-        desktop_path = LOCAL_APPS / f"{fname}.desktop"; counter = 1
-        while desktop_path.exists():
-            desktop_path = LOCAL_APPS / f"{fname}-{counter}.desktop"; counter += 1
-        lines = [
-            '[Desktop Entry]',
-            f'Name={name}',
-            'Type=Application',
-            f'Exec={exec_cmd}',
-            f'Terminal={"true" if terminal else "false"}'
-        ]
-        if comment: lines.append(f'Comment={comment}')
-        if icon:
-            if os.path.isfile(icon):
-                target_dir = pathlib.Path.home()/'.local/share/icons/hicolor/128x128/apps'; target_dir.mkdir(parents=True, exist_ok=True)
-                ext = pathlib.Path(icon).suffix or '.png'
-                target_icon = target_dir / f"{fname}{ext}"
-                try:
-                    shutil.copyfile(icon, target_icon)
-                    lines.append(f'Icon={target_icon}')  # use absolute path for immediate visibility
-                except Exception:
-                    lines.append(f'Icon={icon}')
-            else:
-                lines.append(f'Icon={icon}')
-        if categories:
-            if not categories.endswith(';'): categories += ';'
-            lines.append(f'Categories={categories}')
-        lines.append(f'{CUSTOM_MARKER_KEY}={CUSTOM_MARKER_VALUE}')
         try:
-            LOCAL_APPS.mkdir(parents=True, exist_ok=True)
-            desktop_path.write_text('\n'.join(lines)+'\n', encoding='utf-8')
-            os.chmod(desktop_path, 0o644)
+            desktop_path = core.create_launcher(
+                self.parent_win.index, name, exec_cmd, comment=self.comment_entry.get_text().strip(),
+                icon=self.icon_entry.get_text().strip(), categories=self.categories_entry.get_text().strip(),
+                terminal=self.terminal_switch.get_active())
+        except DuplicateLauncherError as dup:
+            if dup.kind == 'system':
+                self._toast('System app already runs this – use Override & Edit from All Apps'); return
+            self._toast('Already exists – opening for edit' if dup.kind == 'custom' else 'Name already used – opening existing')
+            EditDesktopWindow(self.parent_win, dup.entry).present()
+            self.close(); return
         except Exception as e:
             self._toast(f'Failed: {e}'); return
         self._toast('Created')
-        self.parent_win.reload_list(); self.close()
+        self.parent_win.refresh_ids([desktop_path.name]); self.close()
 
     def _toast(self, msg):
         self.parent_win.toast_overlay.add_toast(Adw.Toast.new(msg))
 
 class ImportDesktopWindow(Gtk.Window):
     def __init__(self, parent_win: 'AppWindow'):
-        super().__init__(title='Import .desktop', transient_for=parent_win, modal=True)
+        super().__init__(title='Import / Export', transient_for=parent_win, modal=True)
         self.parent_win = parent_win
         self.set_default_size(360, 120)
         box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=12, margin_top=12, margin_bottom=12, margin_start=12, margin_end=12)
@@ -426,6 +512,12 @@ class ImportDesktopWindow(Gtk.Window):
         hb = Gtk.Box(spacing=6); hb.append(pick_btn); hb.append(close_btn)
         box.append(Gtk.Label(label='Import an existing .desktop launcher into your local applications.'))
         box.append(hb)
+        # Bulk: all custom launchers + their icons as one archive
+        import_archive_btn = Gtk.Button(label='Import Archive'); import_archive_btn.connect('clicked', self.on_pick_archive)
+        export_archive_btn = Gtk.Button(label='Export All Custom'); export_archive_btn.connect('clicked', self.on_export_archive)
+        ab = Gtk.Box(spacing=6); ab.append(import_archive_btn); ab.append(export_archive_btn)
+        box.append(Gtk.Label(label='Move all custom launchers between machines as a single .tar.gz archive.', xalign=0))
+        box.append(ab)
 
     def on_pick(self, *_):
         dialog = Gtk.FileChooserNative.new('Select .desktop', self, Gtk.FileChooserAction.OPEN, 'Select', 'Cancel')
@@ -436,19 +528,44 @@ class ImportDesktopWindow(Gtk.Window):
         if res == Gtk.ResponseType.ACCEPT and (f := dialog.get_file()):
             path = pathlib.Path(f.get_path())
             try:
-                contents = path.read_text(encoding='utf-8')
-                if f'{CUSTOM_MARKER_KEY}=' not in contents:
-                    contents += f'\n{CUSTOM_MARKER_KEY}={CUSTOM_MARKER_VALUE}\n'
-                target = LOCAL_APPS / path.name
-                if target.exists():
-                    target = LOCAL_APPS / f"imported-{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}-{path.name}"
-                target.write_text(contents, encoding='utf-8')
-                self.parent_win.reload_list()
+                target = core.import_desktop_file(path)
+                self.parent_win.refresh_ids([target.name])
                 self.parent_win.toast_overlay.add_toast(Adw.Toast.new('Imported'))
             except Exception as e:
                 self.parent_win.toast_overlay.add_toast(Adw.Toast.new(f'Import failed: {e}'))
         self.close()
 
+    def on_pick_archive(self, *_):
+        dialog = Gtk.FileChooserNative.new('Select Archive', self, Gtk.FileChooserAction.OPEN, 'Import', 'Cancel')
+        flt = Gtk.FileFilter(); [flt.add_pattern(p) for p in ('*.tar.gz','*.tgz')]; dialog.add_filter(flt)
+        dialog.connect('response', self._archive_chosen); dialog.show()
+
+    def _archive_chosen(self, dialog, res):
+        if res == Gtk.ResponseType.ACCEPT and (f := dialog.get_file()):
+            try:
+                report = core.import_archive(self.parent_win.index, pathlib.Path(f.get_path()))
+                self.parent_win.refresh_ids(report['imported'])  # one refresh for the whole batch
+                msg = f"Imported {len(report['imported'])}"
+                if report['skipped']: msg += f", skipped {len(report['skipped'])} duplicate/invalid"
+                self.parent_win.toast_overlay.add_toast(Adw.Toast.new(msg))
+            except Exception as e:
+                self.parent_win.toast_overlay.add_toast(Adw.Toast.new(f'Import failed: {e}'))
+        self.close()
+
+    def on_export_archive(self, *_):
+        dialog = Gtk.FileChooserNative.new('Export Launchers', self, Gtk.FileChooserAction.SAVE, 'Export', 'Cancel')
+        dialog.set_current_name('launchers.tar.gz')
+        dialog.connect('response', self._export_chosen); dialog.show()
+
+    def _export_chosen(self, dialog, res):
+        if res == Gtk.ResponseType.ACCEPT and (f := dialog.get_file()):
+            try:
+                report = core.export_archive(self.parent_win.index, pathlib.Path(f.get_path()))
+                self.parent_win.toast_overlay.add_toast(Adw.Toast.new(f"Exported {report['entries']} launchers"))
+            except Exception as e:
+                self.parent_win.toast_overlay.add_toast(Adw.Toast.new(f'Export failed: {e}'))
+        self.close()
+
 class EditDesktopWindow(Gtk.Window):
     def __init__(self, parent_win: 'AppWindow', desktop_entry: DesktopEntry):
         super().__init__(title='Edit Launcher', transient_for=parent_win, modal=True)
@@ -456,7 +573,7 @@ class EditDesktopWindow(Gtk.Window):
         self.entry = desktop_entry
         self.set_default_size(520, 520)
         self.original_path = desktop_entry.path
-        self.data = dict(desktop_entry.data)
+        self.data = desktop_entry.full() or dict(desktop_entry.data)  # the list keeps no Comment
 
         box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=12, margin_top=12, margin_bottom=12, margin_start=12, margin_end=12)
         self.set_child(box)
@@ -514,31 +631,10 @@ class EditDesktopWindow(Gtk.Window):
         name = self.name_entry.get_text().strip(); exec_cmd = self.exec_entry.get_text().strip(); comment = self.comment_entry.get_text().strip(); icon = self.icon_entry.get_text().strip(); categories = self.categories_entry.get_text().strip(); terminal = self.terminal_switch.get_active()
         if not name or not exec_cmd: self._toast('Name and Exec required'); return
         try:
-            lines = ['[Desktop Entry]', f'Name={name}', 'Type=Application', f'Exec={exec_cmd}', f'Terminal={"true" if terminal else "false"}']
-            if comment: lines.append(f'Comment={comment}')
-            if icon:
-                if os.path.isfile(icon):
-                    # If pointing to a file, ensure it is staged inside icon theme for consistency, but still use absolute path
-                    fname = ''.join(c for c in name if c.isalnum() or c in ('-','_')) or 'custom'
-                    target_dir = pathlib.Path.home()/'.local/share/icons/hicolor/128x128/apps'; target_dir.mkdir(parents=True, exist_ok=True)
-                    ext = pathlib.Path(icon).suffix or '.png'
-                    target_icon = target_dir / f"{fname}{ext}"
-                    try:
-                        if pathlib.Path(icon) != target_icon:
-                            shutil.copyfile(icon, target_icon)
-                        lines.append(f'Icon={target_icon}')
-                    except Exception:
-                        lines.append(f'Icon={icon}')
-                else:
-                    lines.append(f'Icon={icon}')
-            if categories:
-                if not categories.endswith(';'): categories += ';'
-                lines.append(f'Categories={categories}')
-            if CUSTOM_MARKER_KEY not in self.data: lines.append(f'{CUSTOM_MARKER_KEY}={CUSTOM_MARKER_VALUE}')
-            self.original_path.write_text('\n'.join(lines)+'\n', encoding='utf-8')
+            core.save_launcher(self.original_path, self.data, name, exec_cmd, comment, icon, categories, terminal)
         except Exception as e:
             self._toast(f'Failed: {e}'); return
-        self.parent_win.reload_list(); self._toast('Saved'); self.close()
+        self.parent_win.refresh_ids([self.original_path.name]); self._toast('Saved'); self.close()
 
     def _toast(self, msg):
         self.parent_win.toast_overlay.add_toast(Adw.Toast.new(msg))
@@ -560,12 +656,101 @@ class ConfirmDeleteWindow(Gtk.Window):
 
     def _do_delete(self, *_):
         try:
-            if self.entry.path.exists():
-                self.entry.path.unlink()
+            if core.remove_entry(self.entry):
                 self.parent_win.toast_overlay.add_toast(Adw.Toast.new('Deleted'))
         except Exception as e:
             self.parent_win.toast_overlay.add_toast(Adw.Toast.new(f'Failed: {e}'))
-        self.parent_win.reload_list()
+        self.parent_win.refresh_ids([self.entry.path.name])
+        self.close()
+
+class DuplicatesWindow(Gtk.Window):
+    """Launchers in the list that run the same command, grouped; the redundant ones are pre-selected and can be
+    retired in one batch (custom launchers deleted, system apps hidden)."""
+    def __init__(self, parent_win: 'AppWindow'):
+        super().__init__(title='Duplicate Launchers', transient_for=parent_win, modal=True)
+        self.parent_win = parent_win
+        self.set_default_size(560, 480)
+        box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=12, margin_top=12, margin_bottom=12, margin_start=12, margin_end=12)
+        self.set_child(box)
+        with PROFILE.phase('duplicates'):
+            groups = core.find_duplicates([it.overlay for it in parent_win.items_by_id.values()])
+        self.checks: list[tuple[Gtk.CheckButton, OverlayRecord]] = []
+        groups_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=12)
+        resolved: dict = {}
+        for group in groups:
+            groups_box.append(Gtk.Label(label=group[0].entry.display_name(), xalign=0, css_classes=['heading']))
+            command = ' '.join(core.canonical_exec(group[0].entry.data['Exec'], resolved))
+            groups_box.append(Gtk.Label(label=command, xalign=0, ellipsize=Pango.EllipsizeMode.END, selectable=True, tooltip_text=command))
+            for i, rec in enumerate(group):
+                kind = 'custom' if rec.entry.is_custom() and rec.entry.is_local() else 'system'
+                check = Gtk.CheckButton(label=f'{rec.entry.display_name()} — {rec.desktop_id} ({kind})', active=i > 0)
+                check.set_tooltip_text(str(rec.path))
+                groups_box.append(check); self.checks.append((check, rec))
+        summary = f'{len(groups)} group(s) of launchers running the same command. Checked entries will be hidden (system apps) or deleted (custom launchers).'
+        box.append(Gtk.Label(label=summary if groups else 'No duplicate launchers found.', wrap=True, xalign=0))
+        scroller = Gtk.ScrolledWindow(vexpand=True); scroller.set_child(groups_box)
+        box.append(scroller)
+        btn_box = Gtk.Box(spacing=6)
+        close_btn = Gtk.Button(label='Close'); close_btn.connect('clicked', lambda *_: self.close())
+        retire_btn = Gtk.Button(label='Hide / Delete Checked'); retire_btn.add_css_class('destructive-action')
+        retire_btn.connect('clicked', self._do_retire); retire_btn.set_sensitive(bool(groups))
+        btn_box.append(close_btn); btn_box.append(retire_btn)
+        box.append(btn_box)
+
+    def _do_retire(self, *_):
+        changed = set(); done = 0; failed = 0
+        with core.Transaction():  # one desktop-database refresh for the whole batch
+            for check, rec in self.checks:
+                if not check.get_active(): continue
+                try:
+                    _action, path = core.retire_entry(rec.entry)
+                    changed.update((rec.desktop_id, path.name)); done += 1
+                except Exception as e:
+                    print('Retire error', e); failed += 1
+        self.parent_win.refresh_ids(changed)
+        msg = f'Retired {done} duplicate(s)' + (f', {failed} failed' if failed else '')
+        self.parent_win.toast_overlay.add_toast(Adw.Toast.new(msg))
+        self.close()
+
+class DropImportWindow(Gtk.Window):
+    """Launchers proposed for dropped files and folders (interpreter from the shebang or magic bytes); the checked
+    ones are created in one batch. Candidates an existing launcher (or an earlier candidate) already runs are
+    listed but cannot be checked."""
+    def __init__(self, parent_win: 'AppWindow', candidates: list[dict]):
+        super().__init__(title='Add Dropped Files', transient_for=parent_win, modal=True)
+        self.parent_win = parent_win
+        self.set_default_size(560, 480)
+        box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=12, margin_top=12, margin_bottom=12, margin_start=12, margin_end=12)
+        self.set_child(box)
+        self.checks: list[tuple[Gtk.CheckButton, dict]] = []
+        rows = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+        for c in candidates:
+            how = 'AppImage' if c['kind'] == 'appimage' else 'binary' if c['kind'] == 'elf' else f"{c['wrapper']} script"
+            label = f"{c['name']} — {how}" + (f" (skipped: {c['skip']})" if c['skip'] else '')
+            check = Gtk.CheckButton(label=label, active=not c['skip'], sensitive=not c['skip'])
+            check.set_tooltip_text(f"{c['path']}\nExec={c['exec']}")
+            rows.append(check); self.checks.append((check, c))
+        new = sum(1 for c in candidates if not c['skip'])
+        summary = f'{len(candidates)} launchable file(s) found, {new} new. Checked entries get a launcher in your local applications.'
+        box.append(Gtk.Label(label=summary, wrap=True, xalign=0))
+        scroller = Gtk.ScrolledWindow(vexpand=True); scroller.set_child(rows)
+        box.append(scroller)
+        btn_box = Gtk.Box(spacing=6)
+        close_btn = Gtk.Button(label='Close'); close_btn.connect('clicked', lambda *_: self.close())
+        create_btn = Gtk.Button(label='Create Checked'); create_btn.add_css_class('suggested-action')
+        create_btn.connect('clicked', self._do_create); create_btn.set_sensitive(bool(new))
+        btn_box.append(close_btn); btn_box.append(create_btn)
+        box.append(btn_box)
+
+    def _do_create(self, *_):
+        chosen = [c for check, c in self.checks if check.get_active()]
+        try:
+            with PROFILE.phase('batch_create'):
+                created = core.create_launchers(self.parent_win.index, chosen)
+        except Exception as e:
+            self.parent_win.toast_overlay.add_toast(Adw.Toast.new(f'Failed: {e}')); return
+        self.parent_win.refresh_ids(created)  # one refresh for the whole batch
+        self.parent_win.toast_overlay.add_toast(Adw.Toast.new(f'Created {len(created)} launcher(s)'))
         self.close()
 
 class AppWindow(Adw.ApplicationWindow):
@@ -586,109 +771,467 @@ class AppWindow(Adw.ApplicationWindow):
         header = Adw.HeaderBar(); vbox.append(header)
 
         add_btn = Gtk.Button.new_from_icon_name('list-add-symbolic'); add_btn.set_tooltip_text('Create from executable'); add_btn.connect('clicked', lambda *_: AddDesktopWindow(self).present())
-        import_btn = Gtk.Button.new_from_icon_name('document-open-symbolic'); import_btn.set_tooltip_text('Import existing .desktop'); import_btn.connect('clicked', lambda *_: ImportDesktopWindow(self).present())
-        header.pack_start(add_btn); header.pack_start(import_btn)
+        import_btn = Gtk.Button.new_from_icon_name('document-open-symbolic'); import_btn.set_tooltip_text('Import .desktop / archive, export all'); import_btn.connect('clicked', lambda *_: ImportDesktopWindow(self).present())
+        dup_btn = Gtk.Button.new_from_icon_name('edit-copy-symbolic'); dup_btn.set_tooltip_text('Find duplicate launchers'); dup_btn.connect('clicked', lambda *_: DuplicatesWindow(self).present())
+        header.pack_start(add_btn); header.pack_start(import_btn); header.pack_start(dup_btn)
 
         self.status_label = Gtk.Label(label=''); header.set_title_widget(self.status_label)
 
-        self.list_box = Gtk.ListBox(); self.list_box.set_selection_mode(Gtk.SelectionMode.NONE)
-        self.list_box.set_vexpand(True); self.list_box.set_hexpand(True)
-
-        scroller = Gtk.ScrolledWindow(); scroller.set_child(self.list_box)
+        # In-memory model: store -> filtered -> sorted. Search and the custom/all toggle never touch the disk;
+        # a query is answered by the ranked search index and only the matches get sorted (by rank).
+        self.query = ''
+        self.matches: Optional[dict[str, float]] = None  # desktop_id -> score for the current query
+        self.show_all = False
+        self.facet_index = core.FacetIndex()  # live counts over every item in the store
+        self.facet_filter: dict[str, set[str]] = {f: set() for f in core.FACETS}
+        self.facet_shown: Optional[dict] = None  # counts the open popover was built from
+        self.health_generation = 0
+        self.scan_cancel: Optional[threading.Event] = None
+        self.scan_generation = 0
+        self.scan_progress = (0, 0)  # (entries parsed, desktop IDs found)
+        self.scan_seen: set[str] = set()  # desktop IDs confirmed by the running scan (or by a monitor refresh)
+        self.scan_started = 0.0
+        self.first_frame_ms: Optional[float] = None
+        self.items_by_id: dict[str, EntryItem] = {}
+        self.index = LauncherIndex()  # resolved records + Exec index, kept in step with the model
+        self.pending_ids: set[str] = set()
+        self.pending_commands: list = []  # forwarded command lines waiting for the first scan to finish
+        self.pending_source = 0
+        self.flush_source = 0
+        self.icons = IconLoader()
+        self.launcher = LaunchTimer(self)
+        self.store = Gio.ListStore(item_type=EntryItem)
+        self.filter = Gtk.CustomFilter.new(self._filter_item)
+        self.filter_model = Gtk.FilterListModel(model=self.store, filter=self.filter)
+        self.sorter = Gtk.CustomSorter.new(self._sort_items)
+        self.sort_model = Gtk.SortListModel(model=self.filter_model, sorter=self.sorter)
+        self.sort_model.connect('items-changed', lambda *_: self._update_status())
+
+        # Virtualized list: rows exist only for the visible viewport and are recycled while scrolling
+        factory = Gtk.SignalListItemFactory()
+        factory.connect('setup', self._setup_row)
+        factory.connect('bind', self._bind_row)
+        factory.connect('unbind', lambda _f, list_item: list_item.get_child().unbind())
+        self.list_view = Gtk.ListView(model=Gtk.NoSelection(model=self.sort_model), factory=factory)
+        self.list_view.set_vexpand(True); self.list_view.set_hexpand(True)
+
+        scroller = Gtk.ScrolledWindow(); scroller.set_child(self.list_view)
         scroller.set_hexpand(True); scroller.set_vexpand(True)
         vbox.append(scroller)
 
-        self.show_all = False
         # Toggle button to show all apps
         self.toggle_all_btn = Gtk.Button.new_with_label('All Apps')
         self.toggle_all_btn.set_tooltip_text('Toggle between custom and all applications')
         self.toggle_all_btn.connect('clicked', self.on_toggle_all)
         header.pack_end(self.toggle_all_btn)
+        # Facet filters: category, source dir and state, each value with its live count
+        self.facet_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=4)
+        for m in ('top', 'bottom', 'start', 'end'): getattr(self.facet_box, f'set_margin_{m}')(6)
+        facet_scroller = Gtk.ScrolledWindow(hscrollbar_policy=Gtk.PolicyType.NEVER, propagate_natural_height=True, max_content_height=420)
+        facet_scroller.set_child(self.facet_box)
+        self.facet_popover = Gtk.Popover(child=facet_scroller)
+        self.facet_popover.connect('show', lambda *_: self._refresh_facets(force=True))
+        self.facet_popover.connect('closed', lambda *_: setattr(self, 'facet_shown', None))
+        self.facet_btn = Gtk.MenuButton(label='Filter', popover=self.facet_popover)
+        self.facet_btn.set_tooltip_text('Filter by category, source or state (broken, hidden, …)')
+        header.pack_end(self.facet_btn)
         # Optional search entry
         self.search_entry = Gtk.SearchEntry()
         self.search_entry.set_placeholder_text('Search...')
-        self.search_entry.connect('search-changed', lambda *_: self.reload_list())
+        self.search_entry.connect('search-changed', self.on_search_changed)
         header.pack_end(self.search_entry)
 
+        # Drop files or folders anywhere on the window to propose launchers for them
+        drop = Gtk.DropTarget.new(Gdk.FileList, Gdk.DragAction.COPY)
+        drop.connect('drop', self._on_drop); self.add_controller(drop)
+
+        # Show the last session's list at once (no .desktop file is read); the real scan and the dir watches
+        # start after the first frame and reconcile the list in place
+        self.monitors = []
+        with PROFILE.phase('snapshot'):
+            snapshot = [EntryItem(r) for r in load_snapshot(SYSTEM_APP_DIRS)]
+            for it in snapshot: self._track(it, indexed=False)  # indexed when the scan confirms it
+            self.store.splice(0, 0, snapshot)
+        self.connect('close-request', self._on_close_request)
+        self._after_first_frame(self._start_scanning)
+        self._update_status()
+
+    def _on_close_request(self, *_):
+        save_snapshot([it.overlay for it in self.items_by_id.values()], SYSTEM_APP_DIRS)
+        return False
+
+    def _after_first_frame(self, callback):
+        """Run callback from the main loop once the window's first frame has been painted."""
+        def on_map(*_):
+            self.disconnect(map_handler)
+            clock = self.get_frame_clock()
+            def on_painted(*_):
+                clock.disconnect(paint_handler)
+                GLib.idle_add(callback)
+            paint_handler = clock.connect('after-paint', on_painted)
+        map_handler = self.connect('map', on_map)
+
+    def _start_scanning(self):
+        self.first_frame_ms = (time.perf_counter() - STARTED) * 1000
+        if PROFILE.enabled:
+            PROFILE.add_time('first_frame', self.first_frame_ms / 1000)
+            PROFILE.emit('startup', first_frame_ms=round(self.first_frame_ms, 1), snapshot_entries=len(self.items_by_id))
+        self.monitors = self._watch_app_dirs()
         self.reload_list()
+        return False
+
+    def _on_drop(self, _target, files, _x, _y) -> bool:
+        paths = [f.get_path() for f in files.get_files() if f.get_path()]
+        if not paths: return False
+        self.toast_overlay.add_toast(Adw.Toast.new('Looking for scripts, binaries and AppImages…'))
+        def worker():
+            # Only the first bytes of each file are read, on the sniffing thread pool
+            with PROFILE.phase('detect'):
+                candidates = core.detect_launchables(paths)
+            GLib.idle_add(self._on_detected, candidates)
+        threading.Thread(target=worker, daemon=True).start()
+        return True
+
+    def _on_detected(self, candidates: list[dict]):
+        core.plan_batch(self.index, candidates)  # on the main loop: the index is only touched here
+        if candidates: DropImportWindow(self, candidates).present()
+        else: self.toast_overlay.add_toast(Adw.Toast.new('Nothing launchable found'))
+        return False
+
+    def _setup_row(self, _factory, list_item):
+        with PROFILE.phase('row_build'):
+            list_item.set_child(AppListRow(self))
+        PROFILE.count('rows_built')
+
+    def _bind_row(self, _factory, list_item):
+        with PROFILE.phase('row_bind'):
+            list_item.get_child().bind(list_item.get_item())
+        PROFILE.count('rows_bound')
 
     def on_toggle_all(self, *_):
         self.show_all = not self.show_all
         self.toggle_all_btn.set_label('Custom Only' if self.show_all else 'All Apps')
-        self.reload_list()
+        with PROFILE.phase('filter'):
+            self.filter.changed(Gtk.FilterChange.LESS_STRICT if self.show_all else Gtk.FilterChange.MORE_STRICT)
+        self._update_status()
+
+    def on_facet_toggled(self, btn, facet: str, value: str):
+        wanted = self.facet_filter[facet]
+        if btn.get_active(): wanted.add(value)
+        else: wanted.discard(value)
+        if any(self.facet_filter.values()) and not self.show_all:
+            self.on_toggle_all()  # counts cover every app, so browsing by facet does too
+        else:
+            with PROFILE.phase('filter'):
+                self.filter.changed(Gtk.FilterChange.DIFFERENT)
+            self._update_status()
+
+    def on_clear_facets(self, *_):
+        for wanted in self.facet_filter.values(): wanted.clear()
+        with PROFILE.phase('filter'):
+            self.filter.changed(Gtk.FilterChange.LESS_STRICT)
+        self._refresh_facets(force=True)
+        self._update_status()
+
+    def _refresh_facets(self, force: bool = False):
+        """Rebuild the open Filter popover from the live counts (a no-op when closed or unchanged)."""
+        if not force and (self.facet_shown is None or self.facet_shown == self.facet_index.counts): return
+        self.facet_shown = {f: dict(c) for f, c in self.facet_index.counts.items()}
+        while (child := self.facet_box.get_first_child()) is not None: self.facet_box.remove(child)
+        clear_btn = Gtk.Button(label='Clear filters', sensitive=any(self.facet_filter.values()))
+        clear_btn.connect('clicked', self.on_clear_facets); self.facet_box.append(clear_btn)
+        for facet in core.FACETS:
+            values = self.facet_index.values(facet)
+            wanted = self.facet_filter[facet]
+            # Keep selected values listed even when no item has them any more
+            values += [(v, 0) for v in sorted(wanted - {v for v, _ in values})]
+            if not values: continue
+            heading = Gtk.Label(label=facet.title(), xalign=0); heading.add_css_class('heading'); heading.set_margin_top(6)
+            self.facet_box.append(heading)
+            for value, n in values:
+                btn = Gtk.CheckButton(label=f'{value} ({n})', active=value in wanted)
+                btn.connect('toggled', self.on_facet_toggled, facet, value)
+                self.facet_box.append(btn)
+
+    def on_search_changed(self, *_):
+        query = self.search_entry.get_text().strip().lower()
+        if query == self.query: return
+        self.query = query
+        self._apply_query()
+
+    def _apply_query(self):
+        """Re-run the current query against the search index (fuzzy matches mean results are not monotonic)."""
+        with PROFILE.phase('search'):
+            self.matches = self.index.search_index.scores(self.query) if self.query else None  # the sorter ranks them
+        # The filter and sort models refilter/resort synchronously inside changed()
+        with PROFILE.phase('filter'):
+            self.filter.changed(Gtk.FilterChange.DIFFERENT)
+        with PROFILE.phase('sort'):
+            self.sorter.changed(Gtk.SorterChange.DIFFERENT)
+
+    def _filter_item(self, item, *_):
+        if not self.show_all and not item.custom_local:
+            return False
+        if not core.FacetIndex.matches(item.facets, self.facet_filter):
+            return False
+        if self.matches is None or item.desktop_id in self.matches:
+            return True
+        # Snapshot rows are not indexed until the scan confirms them: match their name meanwhile
+        return self.index.records.get(item.desktop_id) is not item.overlay and all(w in item.sort_key for w in self.query.split())
+
+    def _sort_items(self, a, b, *_):
+        if self.matches is not None:
+            sa = self.matches.get(a.desktop_id, 0); sb = self.matches.get(b.desktop_id, 0)
+            if sa != sb: return -1 if sa > sb else 1
+        return (a.sort_key > b.sort_key) - (a.sort_key < b.sort_key)
+
+    def _update_status(self):
+        if self.scan_cancel is not None:
+            done, total = self.scan_progress
+            self.status_label.set_text(f'Scanning… {done}/{total}')
+            return
+        selected = sum(len(v) for v in self.facet_filter.values())
+        self.facet_btn.set_label(f'Filter ({selected})' if selected else 'Filter')
+        text = f"{'Filtered' if selected else 'All' if self.show_all else 'Custom'} Apps: {self.sort_model.get_n_items()}"
+        broken = self.facet_index.counts['state']['broken']
+        if broken and 'broken' not in self.facet_filter['state']: text += f" · {broken} broken"
+        if PROFILE.enabled:
+            # Short form in the header, every phase and counter in the tooltip
+            if self.first_frame_ms is not None: text += f" · first frame {self.first_frame_ms:.0f} ms"
+            scan = PROFILE.snapshot()['phases'].get('scan_total')
+            if scan: text += f" · scan {scan['ms']:.0f} ms"
+            self.status_label.set_tooltip_text(PROFILE.summary())
+        self.status_label.set_text(text)
+        self._refresh_facets()
 
     def reload_list(self):
-        # Clear existing children (GTK4 removed get_children())
-        child = self.list_box.get_first_child()
-        while child is not None:
-            next_child = child.get_next_sibling()
-            self.list_box.remove(child)
-            child = next_child
-        query = (self.search_entry.get_text().strip().lower() if hasattr(self, 'search_entry') else '')
-        entries = []
-        seen = set()
-        dirs = SYSTEM_APP_DIRS if self.show_all else [LOCAL_APPS]
-        for d in dirs:
-            if not d or not d.exists():
-                continue
-            for p in d.glob('*.desktop'):
-                name_key = p.name
-                # User/local overrides take precedence, skip if already seen
-                if name_key in seen:
-                    continue
-                entry = DesktopEntry(p)
-                if not self.show_all and not entry.is_custom():
-                    continue
-                if query and query not in entry.display_name().lower():
-                    continue
-                entries.append(entry)
-                seen.add(name_key)
-        entries.sort(key=lambda e: e.display_name().lower())
-        for e in entries:
-            self.list_box.append(AppListRow(e, self))
-        self.status_label.set_text(f"{'All' if self.show_all else 'Custom'} Apps: {len(entries)}")
-
-    def has_system_counterpart(self, filename: str) -> bool:
-        for d in SYSTEM_APP_DIRS:
-            if d == LOCAL_APPS: continue
-            p = d / filename
-            if p.exists():
-                return True
+        """Rescan all application dirs on a worker thread; entries stream into the model in batches.
+
+        Any scan still running is cancelled. The current list stays visible and is reconciled in place: unchanged
+        items are kept, changed ones replaced, and items the scan did not find are removed when it finishes.
+        """
+        if self.scan_cancel is not None:
+            self.scan_cancel.set()
+        cancel = threading.Event()
+        self.scan_cancel = cancel
+        self.scan_generation += 1
+        self.scan_progress = (0, 0)
+        self.scan_seen = set()
+        self.scan_started = time.perf_counter()
+        PROFILE.reset()
+        self.icons.forget_files()
+        self._update_status()
+        threading.Thread(target=self._scan_worker, args=(self.scan_generation, cancel), daemon=True).start()
+
+    def _scan_worker(self, generation: int, cancel: threading.Event):
+        # Pass 1: one listing per dir resolves shadowing. Pass 2: parse only the effective files.
+        with PROFILE.phase('overlay'):
+            index = build_overlay_index(SYSTEM_APP_DIRS, ENTRY_CACHE)
+        total = len(index); batch: list[OverlayRecord] = []
+        for done, rec in enumerate(index.values(), 1):
+            if cancel.is_set():
+                return
+            rec.entry = ENTRY_CACHE.get(rec.path)
+            if rec.entry is not None: batch.append(rec)
+            if len(batch) >= SCAN_BATCH_SIZE:
+                GLib.idle_add(self._on_scan_batch, generation, batch, (done, total), False)
+                batch = []
+        with PROFILE.phase('cache_save'):
+            ENTRY_CACHE.save()
+            save_snapshot(index.values(), SYSTEM_APP_DIRS)
+        GLib.idle_add(self._on_scan_batch, generation, batch, (total, total), True)
+
+    def _on_scan_batch(self, generation: int, records: list[OverlayRecord], progress: tuple[int, int], done: bool):
+        if generation != self.scan_generation:
+            return False  # superseded by a newer scan
+        with PROFILE.phase('model'):
+            self._merge_batch([EntryItem(r) for r in records])
+        self.scan_progress = progress
+        if done:
+            self.scan_cancel = None
+            self._drop_unseen()
+            for cmdline in self.pending_commands: self.answer_command_line(cmdline)
+            self.pending_commands = []
+            self.check_health(list(self.items_by_id.values()), full=True)
+            if PROFILE.enabled:
+                PROFILE.add_time('scan_total', time.perf_counter() - self.scan_started)
+                PROFILE.emit('scan', entries=len(self.items_by_id), shown=self.sort_model.get_n_items())
+        if self.query: self._apply_query()
+        self._update_status()
         return False
 
-    def find_custom_by_exec(self, exec_cmd: str):
-        norm = exec_cmd.strip()
-        if not norm:
-            return None
-        if LOCAL_APPS.exists():
-            for p in LOCAL_APPS.glob('*.desktop'):
-                try:
-                    e = DesktopEntry(p)
-                    if e.is_custom() and e.data.get('Exec','').strip() == norm:
-                        return e
-                except Exception:
-                    pass
-        return None
-    def find_system_by_exec(self, exec_cmd: str):
-        norm = exec_cmd.strip()
-        if not norm:
-            return None
+    def _merge_batch(self, items: list[EntryItem]):
+        # Only new and changed items touch the store (splicing also runs the filter and sorter over them)
+        fresh = []
+        for it in items:
+            self.scan_seen.add(it.desktop_id)
+            old = self.items_by_id.get(it.desktop_id)
+            if old is None:
+                self._track(it); fresh.append(it)
+            elif self._changed(old.overlay, it.overlay):
+                self._replace_item(old, it)
+            elif self.index.records.get(old.desktop_id) is not old.overlay:
+                # Kept from the snapshot, which has no search terms: index it with the scanned entry
+                old.entry = old.overlay.entry = it.entry
+                self.index.add(old.overlay)
+        if fresh: self.store.splice(self.store.get_n_items(), 0, fresh)
+
+    def _drop_unseen(self):
+        """After a full scan: remove items (e.g. from the snapshot) whose desktop ID no longer exists."""
+        for it in [it for desktop_id, it in self.items_by_id.items() if desktop_id not in self.scan_seen]:
+            self._untrack(it)
+            found, pos = self.store.find(it)
+            if found: self.store.remove(pos)
+
+    @staticmethod
+    def _changed(old: OverlayRecord, new: OverlayRecord) -> bool:
+        # Snapshot entries carry no search terms (()); only the list keys can tell whether they changed
+        return (old.path != new.path or old.shadows != new.shadows or old.entry.data != new.entry.data
+                or (bool(old.entry.terms) and old.entry.terms != new.entry.terms))
+
+    def _watch_app_dirs(self) -> list:
+        monitors = []
         for d in SYSTEM_APP_DIRS:
-            if not d.exists() or d == LOCAL_APPS:
-                continue
-            for p in d.glob('*.desktop'):
-                try:
-                    e = DesktopEntry(p)
-                    if e.data.get('Exec','').strip() == norm:
-                        return e
-                except Exception:
-                    pass
-        return None
+            try:
+                mon = Gio.File.new_for_path(str(d)).monitor_directory(Gio.FileMonitorFlags.WATCH_MOVES, None)
+            except GLib.Error as e:
+                print('Monitor error', d, e); continue
+            mon.connect('changed', self._on_dir_changed)
+            monitors.append(mon)  # keep a reference or the monitor is dropped
+        return monitors
+
+    def _on_dir_changed(self, _monitor, file, other_file, _event):
+        for f in (file, other_file):
+            name = f.get_basename() if f is not None else None
+            if name and name.endswith('.desktop'):
+                self.pending_ids.add(name)
+        if self.pending_ids and not self.pending_source:
+            # Coalesce bursts (package installs, editors writing temp files) into one refresh
+            self.pending_source = GLib.timeout_add(MONITOR_COALESCE_MS, self._flush_pending)
+
+    def _flush_pending(self):
+        self.pending_source = 0
+        ids, self.pending_ids = self.pending_ids, set()
+        self.refresh_ids(ids)
+        return False
+
+    def refresh_ids(self, desktop_ids):
+        """Re-resolve only the given desktop IDs across the app dirs and add, update or remove their items."""
+        added = []
+        for desktop_id in desktop_ids:
+            self.scan_seen.add(desktop_id)  # resolved just now: a running scan must not drop it
+            rec = resolve_overlay(desktop_id, SYSTEM_APP_DIRS, ENTRY_CACHE)
+            old = self.items_by_id.get(desktop_id)
+            if rec is None:
+                if old is not None:
+                    self._untrack(old)
+                    found, pos = self.store.find(old)
+                    if found: self.store.remove(pos)
+            elif old is None:
+                item = EntryItem(rec); self._track(item); added.append(item)
+            elif self._changed(old.overlay, rec):
+                self._replace_item(old, EntryItem(rec))
+        if added: self.store.splice(self.store.get_n_items(), 0, added)  # one refilter/resort for a whole batch
+        ENTRY_CACHE.save()
+        self.check_health([self.items_by_id[i] for i in desktop_ids if i in self.items_by_id])
+        if ICON_STORE.dirty or core.DESKTOP_DB.dirty: self._schedule_flush()
+        if self.query: self._apply_query()
+        self._update_status()
+
+    def check_health(self, items: list[EntryItem], full: bool = False):
+        """Validate Exec/TryExec/Icon of the given items on the health checker's thread pool (cached by mtime)."""
+        if not items: return
+        if full: self.health_generation += 1  # a newer full check supersedes the results of an older one
+        generation = self.health_generation
+        def worker():
+            with PROFILE.phase('health'):
+                problems = HEALTH.check([it.overlay for it in items])
+            HEALTH.save()
+            GLib.idle_add(self._on_health, generation, items, problems)
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _on_health(self, generation: int, items: list[EntryItem], problems: dict[str, list[str]]):
+        if generation != self.health_generation:
+            return False
+        changed = False
+        for it in items:
+            if self.items_by_id.get(it.desktop_id) is not it: continue  # replaced or removed meanwhile
+            found = problems.get(it.desktop_id, [])
+            if found == it.problems: continue
+            it.problems = found; changed = True
+            it.facets = core.record_facets(it.overlay, broken=bool(found))
+            self.facet_index.add(it.desktop_id, it.facets)
+            self.item_changed(it.desktop_id)
+        if changed: self._update_status()
+        return False
+
+    def answer_command_line(self, cmdline: Gio.ApplicationCommandLine):
+        """Run a forwarded `--COMMAND ...` against a fork of the warm index on a worker thread.
+
+        The caller's process waits until cmdline is completed (from the main loop) with the command's output
+        and exit status. Before the first scan has finished command lines are queued: the index is not complete.
+        """
+        if self.first_frame_ms is None or self.scan_cancel is not None:
+            self.pending_commands.append(cmdline); return
+        argv = launcher_cli.to_cli_args(cmdline.get_arguments()[1:])
+        index = self.index.fork()  # the list keeps changing the real index while the command runs
+        def worker():
+            before = dict(index.records)
+            with PROFILE.phase('command_line'):
+                status, out, err = launcher_cli.capture(argv, index, forwarded=True)
+            # Mutating commands re-resolve their targets in the fork; the list re-resolves them in the real index
+            changed = [i for i in before.keys() | index.records.keys() if before.get(i) is not index.records.get(i)]
+            GLib.idle_add(self._command_done, cmdline, status, out, err, changed)
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _command_done(self, cmdline: Gio.ApplicationCommandLine, status: int, out: str, err: str, changed: list[str]):
+        if out: cmdline.print_literal(out)
+        if err: cmdline.printerr_literal(err)
+        cmdline.set_exit_status(status)  # after the handler returned, so it is not overwritten
+        if hasattr(cmdline, 'done'): cmdline.done()  # GLib >= 2.80; older ones complete when it is freed
+        if changed: self.refresh_ids(changed)
+        return False
+
+    def item_changed(self, desktop_id: str):
+        """Rebind (and refilter) the row of an item whose derived state changed in place."""
+        item = self.items_by_id.get(desktop_id)
+        found, pos = self.store.find(item) if item is not None else (False, 0)
+        if found: self.store.items_changed(pos, 1, 1)
+
+    def _schedule_flush(self):
+        if self.flush_source: GLib.source_remove(self.flush_source)
+        self.flush_source = GLib.timeout_add(FLUSH_MS, self._flush_batched)
+
+    def _flush_batched(self):
+        self.flush_source = 0
+        threading.Thread(target=core.flush_pending, daemon=True).start()
+        return False
+
+    def _replace_item(self, old: EntryItem, new: EntryItem):
+        self._untrack(old); self._track(new)
+        found, pos = self.store.find(old)
+        if found: self.store.splice(pos, 1, [new])
+        else: self.store.append(new)
+
+    def _track(self, item: EntryItem, indexed: bool = True):
+        self.items_by_id[item.desktop_id] = item
+        self.facet_index.add(item.desktop_id, item.facets)
+        if indexed: self.index.add(item.overlay)
+
+    def _untrack(self, item: EntryItem):
+        if self.items_by_id.get(item.desktop_id) is item:
+            del self.items_by_id[item.desktop_id]
+            self.facet_index.remove(item.desktop_id)
+        if self.index.records.get(item.desktop_id) is item.overlay:
+            self.index.remove(item.desktop_id)
 
 class App(Adw.Application):
     def __init__(self):
-        super().__init__(application_id=APP_ID, flags=Gio.ApplicationFlags.FLAGS_NONE)
+        super().__init__(application_id=APP_ID, flags=Gio.ApplicationFlags.HANDLES_COMMAND_LINE)
+        self.connect('startup', lambda *_: ensure_css())
         self.connect('activate', self.on_activate)
+        self.connect('command-line', self.on_command_line)
+        self.connect('shutdown', lambda *_: core.flush_pending())
 
     def on_activate(self, app):
         win = self.props.active_window
@@ -696,23 +1239,33 @@ class App(Adw.Application):
             win = AppWindow(self)
         win.present()
 
+    def on_command_line(self, app, cmdline):
+        args = cmdline.get_arguments()[1:]
+        if not args or not launcher_cli.command_option(args[0]):
+            self.activate(); return 0
+        win = self.props.active_window
+        if win is None:
+            # Forwarded before our window exists: answer with a scan of our own
+            status, out, err = launcher_cli.capture(launcher_cli.to_cli_args(args), forwarded=True)
+            if out: cmdline.print_literal(out)
+            if err: cmdline.printerr_literal(err)
+            return status
+        # Answered from a worker thread: the exit status is set on cmdline when the command completes, which
+        # is after GApplication has applied this handler's return value
+        win.answer_command_line(cmdline)
+        return 0
+
 def ensure_css():
     provider = Gtk.CssProvider()
     provider.load_from_data(CSS)
-    display = Gdk.Display.get_default() if hasattr(Gtk, 'Display') else None
     Gtk.StyleContext.add_provider_for_display(
         Gdk.Display.get_default(), provider, Gtk.STYLE_PROVIDER_PRIORITY_USER
     )
 
 if __name__ == '__main__':
-    # Avoid importing Gdk earlier if not needed
-    gi.require_version('Gdk', '4.0')
-    from gi.repository import Gdk
-    # Apply CSS
-    provider = Gtk.CssProvider()
-    provider.load_from_data(CSS)
-    Gtk.StyleContext.add_provider_for_display(
-        Gdk.Display.get_default(), provider, Gtk.STYLE_PROVIDER_PRIORITY_USER
-    )
+    # --profile[=DEST] is ours (GApplication rejects unknown options): same values as $ADM_PROFILE
+    for arg in list(sys.argv[1:]):
+        if arg == '--profile' or arg.startswith('--profile='):
+            PROFILE.configure(arg.partition('=')[2] or '1'); sys.argv.remove(arg)
     app = App()
     app.run()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""Benchmarks for the GTK-free core over synthetic application dirs (no display needed).
+
+    python3 benchmarks/bench_core.py                          # 100, 1,000 and 10,000 entries
+    python3 benchmarks/bench_core.py --sizes 1000 --repeat 9 --output after.json
+    python3 benchmarks/bench_core.py --output after.json --compare before.json
+
+Each tree has system, Flatpak-style (reverse-DNS IDs) and local custom launchers, local overrides of
+system apps (some hidden, some orphaned), localized keys and [Desktop Action] groups. It lives in a temp dir
+that stands in for SYSTEM_APP_DIRS / LOCAL_APPS; the user's real dirs and cache are never touched.
+Results are JSON: one record per (size, benchmark) with min/median/mean wall time in milliseconds
+(size 0 holds size-independent results such as the core's import time). Memory records (memory_*) give
+bytes_per_entry instead: what a warm start keeps allocated per entry, measured with tracemalloc.
+"""
+import argparse, atexit, gc, json, os, pathlib, platform, random, shutil, statistics, subprocess, sys, tempfile, time
+
+ROOT = pathlib.Path(tempfile.mkdtemp(prefix='adm-bench-'))
+atexit.register(shutil.rmtree, ROOT, ignore_errors=True)  # also after --help, usage errors and plain imports
+# launcher_core resolves its dirs at import time: point them at the sandbox first
+os.environ['XDG_DATA_HOME'] = str(ROOT / 'home')
+os.environ['XDG_DATA_DIRS'] = str(ROOT / 'usr')
+os.environ['XDG_CACHE_HOME'] = str(ROOT / 'cache')
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+import launcher_core as core
+
+SIZES = (100, 1000, 10000)
+WORDS = ('editor', 'image', 'viewer', 'music', 'player', 'terminal', 'browser', 'office', 'mail', 'chat',
+         'notes', 'backup', 'disk', 'network', 'monitor', 'paint', 'video', 'camera', 'calendar', 'archive')
+CATEGORIES = ('Utility;', 'Development;IDE;', 'Graphics;Viewer;', 'AudioVideo;Player;', 'Network;WebBrowser;', 'Office;')
+QUERIES = ('edit', 'image viewer', 'termnal', 'org.example', 'music player', 'zzzz')
+
+def entry_text(name: str, exec_cmd: str, rng: random.Random, custom: bool = False, extra: str = '') -> str:
+    w = rng.sample(WORDS, 3)
+    lines = ['[Desktop Entry]', 'Type=Application', f'Name={name}', f'Name[de]={name} (de)', f'Name[fr]={name} (fr)',
+             f'GenericName={w[0].title()} {w[1].title()}', f'Comment=A {w[0]} for {w[2]}', f'Comment[de]=Ein {w[0]}',
+             f'Keywords={";".join(w)};', f'Exec={exec_cmd}', f'Icon={w[1]}', f'Categories={rng.choice(CATEGORIES)}',
+             'MimeType=text/plain;', 'Actions=new-window;']
+    if custom: lines.append(f'{core.CUSTOM_MARKER_KEY}={core.CUSTOM_MARKER_VALUE}')
+    if extra: lines.append(extra)
+    lines += ['', '[Desktop Action new-window]', 'Name=New Window', 'Name[de]=Neues Fenster', f'Exec={exec_cmd} --new-window']
+    return '\n'.join(lines) + '\n'
+
+def generate(root: pathlib.Path, n: int, seed: int) -> dict:
+    """Write n entries: ~70% system, ~15% Flatpak, ~10% custom local; ~5% of system IDs get local overrides."""
+    rng = random.Random(seed)
+    system, flatpak, local = root / 'usr/applications', root / 'flatpak/applications', root / 'home/applications'
+    for d in (system, flatpak, local):
+        shutil.rmtree(d, ignore_errors=True); d.mkdir(parents=True)
+    n_flatpak, n_local = n * 15 // 100, n // 10
+    n_system = n - n_flatpak - n_local
+    execs = {'system': [], 'custom': []}
+    for i in range(n_system):
+        exec_cmd = f'/usr/bin/app{i} %U'
+        (system / f'app{i}.desktop').write_text(entry_text(f'App {i} {WORDS[i % len(WORDS)].title()}', exec_cmd, rng), encoding='utf-8')
+        execs['system'].append(exec_cmd)
+    for i in range(n_flatpak):
+        exec_cmd = f'/usr/bin/flatpak run --branch=stable org.example.App{i}'
+        (flatpak / f'org.example.App{i}.desktop').write_text(entry_text(f'Flat {i}', exec_cmd, rng), encoding='utf-8')
+        execs['system'].append(exec_cmd)
+    for i in range(n_local):
+        exec_cmd = f"python3 '/home/user/My Scripts/tool{i}.py'"
+        (local / f'tool{i}.desktop').write_text(entry_text(f'Tool {i}', exec_cmd, rng, custom=True), encoding='utf-8')
+        execs['custom'].append(exec_cmd)
+    overrides = rng.sample(range(n_system), max(1, n // 20))
+    for k, i in enumerate(overrides):
+        extra = f'{core.OVERRIDE_MARKER_KEY}=1' + ('\nHidden=true' if k % 2 else '')
+        (local / f'app{i}.desktop').write_text(entry_text(f'App {i} (mine)', f'/usr/bin/app{i} %U', rng, True, extra), encoding='utf-8')
+    for i in range(max(1, n // 200)):  # overrides whose system app is gone
+        (local / f'gone{i}.desktop').write_text(entry_text(f'Gone {i}', f'/usr/bin/gone{i}', rng, True, f'{core.OVERRIDE_MARKER_KEY}=1'), encoding='utf-8')
+    return {'dirs': [local, system, flatpak], 'execs': execs, 'files': n + len(overrides) + max(1, n // 200)}
+
+def measure(fn, repeat: int, setup=None) -> list[float]:
+    times = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        t0 = time.perf_counter()
+        fn(arg) if setup else fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return times
+
+def bench_size(n: int, repeat: int, seed: int) -> list[dict]:
+    tree = generate(ROOT, n, seed)
+    dirs = tree['dirs']
+    paths = [d / name for d in dirs for name in sorted(os.listdir(d))]
+    cache_file = ROOT / 'cache' / f'bench-{n}.json'
+    rng = random.Random(seed)
+    lookups = (rng.sample(tree['execs']['system'], min(500, len(tree['execs']['system'])))
+               + rng.sample(tree['execs']['custom'], min(250, len(tree['execs']['custom'])))
+               + [f'/opt/missing{i}' for i in range(250)])
+    results = []
+    def record(name: str, times: list[float], ops: int = 1):
+        results.append({'size': n, 'bench': name, 'ops': ops, 'min_ms': round(min(times), 4),
+                        'median_ms': round(statistics.median(times), 4), 'mean_ms': round(statistics.fmean(times), 4),
+                        'per_op_us': round(statistics.median(times) * 1000 / ops, 3)})
+
+    # DesktopEntry._parse: header pass over every file (the list's per-file cost without a cache)
+    record('parse_header', measure(lambda: [core.DesktopEntry(p) for p in paths], repeat), len(paths))
+    # Full lossless parse, as done when an entry is edited
+    record('parse_full', measure(lambda: [core.DesktopFile.load(p) for p in paths], repeat), len(paths))
+    # reload_list: overlay resolution + parsing + Exec/search indexing, with no cache file (first start)
+    def cold_cache():
+        cache_file.unlink(missing_ok=True)
+        return core.EntryCache(cache_file)
+    record('scan_cold', measure(lambda cache: core.LauncherIndex(dirs, cache).load(), repeat, cold_cache), len(paths))
+    # ... and with the cache file a previous run left behind (every later start)
+    core.LauncherIndex(dirs, core.EntryCache(cache_file)).load()
+    record('scan_warm', measure(lambda cache: core.LauncherIndex(dirs, cache).load(), repeat,
+                                lambda: core.EntryCache(cache_file)), len(paths))
+    index = core.LauncherIndex(dirs, core.EntryCache(cache_file)).load()
+    # Overlay resolution alone (one listing per dir) and the override/orphan checks the badges use
+    record('overlay_index', measure(lambda: core.build_overlay_index(dirs, index.cache), repeat))
+    records = list(index.records.values())
+    record('override_state', measure(lambda: [(r.is_override(), r.is_orphaned()) for r in records], repeat), len(records))
+    # Facet counts: one pass over every entry, then per-item upkeep (a health result flips one state)
+    def facet_build():
+        facets = core.FacetIndex()
+        for r in records: facets.add(r.desktop_id, core.record_facets(r))
+        return facets
+    record('facets_build', measure(facet_build, repeat), len(records))
+    facets = facet_build()
+    record('facets_update', measure(lambda: [facets.add(r.desktop_id, core.record_facets(r, broken=True)) for r in records[:200]], repeat), 200)
+    sample = rng.sample(sorted(index.records), min(200, len(index.records)))
+    record('resolve_overlay', measure(lambda: [core.resolve_overlay(i, dirs, index.cache) for i in sample], repeat), len(sample))
+    # Duplicate checks (hits and misses)
+    record('find_custom_by_exec', measure(lambda: [index.find_custom_by_exec(e) for e in lookups], repeat), len(lookups))
+    record('find_system_by_exec', measure(lambda: [index.find_system_by_exec(e) for e in lookups], repeat), len(lookups))
+    record('search', measure(lambda: [index.search_index.query(q) for q in QUERIES], repeat), len(QUERIES))
+    # What the GUI asks for: the matches and their scores, unordered (its sorter ranks them)
+    record('search_scores', measure(lambda: [index.search_index.scores(q) for q in QUERIES], repeat), len(QUERIES))
+    # Duplicate report over every entry (PATH lookups and realpath() are memoized per run)
+    record('find_duplicates', measure(lambda: core.find_duplicates(records), repeat), len(records))
+    # Startup: the GUI shows the last session's snapshot before its first frame, then scans
+    snapshot = ROOT / 'cache' / f'snapshot-{n}.json'
+    record('snapshot_save', measure(lambda: core.save_snapshot(records, dirs, snapshot), repeat), len(records))
+    record('snapshot_load', measure(lambda: core.load_snapshot(dirs, snapshot), repeat), len(records))
+    # Health check on the thread pool: every entry resolved (cold), then only stat()s (cached by mtime)
+    health = ROOT / 'cache' / f'health-{n}.json'
+    def cold_health():
+        health.unlink(missing_ok=True)
+        return core.HealthChecker(health)
+    record('health_cold', measure(lambda checker: checker.check(records), repeat, cold_health), len(records))
+    checker = core.HealthChecker(health); checker.check(records)
+    record('health_cached', measure(lambda: checker.check(records), repeat), len(records))
+    # A dropped folder: walk it and sniff shebangs / magic bytes on the thread pool, then de-duplicate
+    drop = generate_drop(ROOT / f'drop-{n}', n // 10, rng)
+    record('detect_drop', measure(lambda: core.plan_batch(index, core.detect_launchables([drop])), repeat), n // 10)
+    return results
+
+def generate_drop(root: pathlib.Path, n: int, rng: random.Random) -> pathlib.Path:
+    """n files under root: shebang scripts with and without extensions, ELF-like binaries and non-launchable data."""
+    shutil.rmtree(root, ignore_errors=True)
+    for i in range(n):
+        d = root / f'dir{i % 10}'; d.mkdir(parents=True, exist_ok=True)
+        kind = rng.randrange(4)
+        if kind == 0: (d / f'tool{i}').write_text('#!/usr/bin/env python3.12\nprint(1)\n')
+        elif kind == 1: (d / f'run{i}.sh').write_text('#!/bin/sh\necho\n')
+        elif kind == 2: (d / f'bin{i}').write_bytes(b'\x7fELF\x02\x01\x01' + bytes(64)); os.chmod(d / f'bin{i}', 0o755)
+        else: (d / f'notes{i}.txt').write_text('notes\n')
+    return root
+
+def bench_memory(n: int, seed: int) -> list[dict]:
+    """Bytes kept per entry after a warm start: the entry cache alone, then the index (records, entries, search)."""
+    import tracemalloc
+    tree = generate(ROOT, n, seed)
+    dirs = tree['dirs']
+    cache_file = ROOT / 'cache' / f'memory-{n}.json'
+    core.LauncherIndex(dirs, core.EntryCache(cache_file)).load()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        cache = core.EntryCache(cache_file)
+        gc.collect(); after_cache = tracemalloc.get_traced_memory()[0]
+        index = core.LauncherIndex(dirs, cache).load()
+        gc.collect(); after_index = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    entries = len(index.records)
+    return [{'size': n, 'bench': name, 'entries': entries, 'bytes_per_entry': round(size / entries)}
+            for name, size in (('memory_cache', after_cache - start), ('memory_index', after_index - after_cache),
+                               ('memory_total', after_index - start))]
+
+def bench_import(repeat: int) -> list[dict]:
+    """Fresh-interpreter cost of importing the core (what the CLI and the GUI pay before doing anything)."""
+    root = str(pathlib.Path(__file__).resolve().parent.parent)
+    def run(code):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], cwd=root, env={**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'}, check=True)
+        return (time.perf_counter() - t0) * 1000
+    base = [run('pass') for _ in range(repeat)]
+    times = [run('import launcher_core') - statistics.median(base) for _ in range(repeat)]
+    return [{'size': 0, 'bench': 'import_core', 'ops': 1, 'min_ms': round(min(times), 4),
+             'median_ms': round(statistics.median(times), 4), 'mean_ms': round(statistics.fmean(times), 4),
+             'per_op_us': round(statistics.median(times) * 1000, 3)}]
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=pathlib.Path(__file__).parent,
+                              capture_output=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ''
+
+def compare(results: list[dict], baseline_path: str, out):
+    base = {(r['size'], r['bench']): r for r in json.loads(pathlib.Path(baseline_path).read_text())['results']}
+    out.write(f"{'size':>6} {'benchmark':<22} {'before':>10} {'after':>10} {'ratio':>7}\n")
+    for r in results:
+        b = base.get((r['size'], r['bench']))
+        if b is None: continue
+        key = 'bytes_per_entry' if 'bytes_per_entry' in r else 'median_ms'  # memory: bytes, timings: ms
+        ratio = r[key] / b[key] if b[key] else float('inf')
+        out.write(f"{r['size']:>6} {r['bench']:<22} {b[key]:>10.3f} {r[key]:>10.3f} {ratio:>6.2f}x\n")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark scanning, parsing, search and duplicate checks on synthetic trees.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES))
+    parser.add_argument('--repeat', type=int, default=5, help='runs per benchmark (the median is reported)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write JSON results here (default: stdout)')
+    parser.add_argument('--compare', metavar='BASELINE', help='print median ratios against an earlier JSON result')
+    args = parser.parse_args(argv)
+    try:
+        results = bench_import(args.repeat)
+        for n in args.sizes:
+            results += bench_size(n, args.repeat, args.seed)
+            results += bench_memory(n, args.seed)
+            print(f'{n} entries done', file=sys.stderr)
+    finally:
+        shutil.rmtree(ROOT, ignore_errors=True)
+    report = {'meta': {'revision': git_revision(), 'python': platform.python_version(), 'platform': platform.platform(),
+                       'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'repeat': args.repeat, 'seed': args.seed},
+              'results': results}
+    payload = json.dumps(report, indent=2)
+    if args.output: pathlib.Path(args.output).write_text(payload + '\n', encoding='utf-8')
+    else: print(payload)
+    if args.compare: compare(results, args.compare, sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
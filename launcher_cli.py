@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""Headless command-line interface to App Drawer Manager (no GTK needed). Every command prints JSON.
+
+    launcher_cli.py list [--all]
+    launcher_cli.py search QUERY... [--all]
+    launcher_cli.py add FILE... [--name NAME] [--wrapper W] [--args ARGS] [--icon ICON] [--categories C] [--terminal]
+    launcher_cli.py add-tree PATH... [--dry-run]
+    launcher_cli.py hide|unhide|revert|delete TARGET...
+    launcher_cli.py export ARCHIVE | import ARCHIVE
+    launcher_cli.py duplicates [--retire]
+    launcher_cli.py health [--all] [--include-ok]
+    launcher_cli.py latency [TARGET...]
+
+Targets are desktop IDs ('firefox.desktop' or 'firefox') or paths to .desktop files. Mutating commands
+print one result object per target and exit with status 1 if any of them failed.
+
+The same commands are accepted as `app_launcher_manager.py --list ...`: if the GUI is running they are answered
+from its in-memory index, otherwise by a one-off scan here.
+"""
+import argparse, functools, io, json, os, pathlib, sys
+from typing import Optional
+
+import launcher_core as core
+
+COMMANDS = ('list', 'search', 'add', 'add-tree', 'hide', 'unhide', 'revert', 'delete', 'export', 'import', 'duplicates', 'health', 'latency', 'apply')
+
+def _result(target: str, ok: bool, **extra) -> dict:
+    return {'target': target, 'ok': ok, **extra}
+
+def cmd_list(index: core.LauncherIndex, args) -> list:
+    return [core.entry_json(r) for r in index.search('', args.all)]
+
+def cmd_search(index: core.LauncherIndex, args) -> list:
+    return [core.entry_json(r) for r in index.search(' '.join(args.query), args.all)]
+
+def cmd_add(index: core.LauncherIndex, args) -> list:
+    results = []
+    for f in args.files:
+        path = str(pathlib.Path(f).expanduser().resolve())
+        if not os.path.isfile(path):
+            results.append(_result(f, False, error='No such file')); continue
+        name = args.name or pathlib.Path(path).stem.replace('_',' ').title()
+        exec_cmd = core.build_exec_command(path, args.wrapper, args.args)
+        if not args.no_chmod:
+            try: core.make_executable(path)
+            except OSError: pass
+        try:
+            desktop_path = core.create_launcher(index, name, exec_cmd, comment=args.comment, icon=args.icon,
+                                                categories=args.categories, terminal=args.terminal)
+            results.append(_result(f, True, id=desktop_path.name, path=str(desktop_path)))
+        except core.DuplicateLauncherError as dup:
+            results.append(_result(f, False, error=str(dup), kind=dup.kind, existing=str(dup.entry.path)))
+        except Exception as e:
+            results.append(_result(f, False, error=str(e)))
+    return results
+
+def cmd_add_tree(index: core.LauncherIndex, args) -> dict:
+    try:
+        with core.PROFILE.phase('detect'):
+            candidates = core.plan_batch(index, core.detect_launchables(args.paths))
+        created = iter([] if args.dry_run else core.create_launchers(index, candidates))
+    except Exception as e:
+        return {'ok': False, 'error': str(e)}
+    launchers = []
+    for c in candidates:
+        item = {k: c[k] for k in ('path', 'kind', 'wrapper', 'name', 'exec')}
+        if c['skip']: item['skipped'] = c['skip']
+        elif not args.dry_run: item['id'] = next(created)
+        launchers.append(item)
+    skipped = sum(1 for c in candidates if c['skip'])
+    return {'ok': True, 'dry_run': args.dry_run, 'found': len(candidates), 'created': 0 if args.dry_run else len(candidates) - skipped,
+            'skipped': skipped, 'launchers': launchers}
+
+def _mutate(index: core.LauncherIndex, targets: list[str], action) -> list:
+    results = []
+    for target in targets:
+        rec = index.resolve_target(target)
+        if rec is None:
+            results.append(_result(target, False, error='Not found')); continue
+        try:
+            error, path = action(rec)
+        except Exception as e:
+            error, path = str(e), None
+        if error:
+            results.append(_result(target, False, id=rec.desktop_id, error=error)); continue
+        index.refresh(rec.desktop_id)
+        if path is not None and path.name != rec.desktop_id: index.refresh(path.name)
+        results.append(_result(target, True, id=rec.desktop_id, path=str(path or rec.path)))
+    return results
+
+def _hide(rec: core.OverlayRecord):
+    if rec.entry.is_custom():
+        return 'Custom launcher; use delete instead', None
+    return None, core.hide_entry(rec.entry)
+
+def _unhide(rec: core.OverlayRecord):
+    if not (rec.entry.is_custom() and rec.entry.is_local()):
+        return 'Not a local override', None
+    return (None, rec.path) if core.unhide_entry(rec.entry) else ('Not hidden', None)
+
+def _revert(rec: core.OverlayRecord):
+    if not rec.is_override():
+        return 'Not an override', None
+    core.remove_entry(rec.entry)
+    return None, rec.path
+
+def _delete(rec: core.OverlayRecord):
+    if not (rec.entry.is_custom() and rec.entry.is_local()):
+        return 'Only custom launchers can be deleted; use hide for system apps', None
+    core.remove_entry(rec.entry)
+    return None, rec.path
+
+def cmd_archive(index: core.LauncherIndex, args) -> dict:
+    path = pathlib.Path(args.archive).expanduser()
+    try:
+        report = core.export_archive(index, path) if args.command == 'export' else core.import_archive(index, path)
+    except Exception as e:
+        return {'ok': False, 'error': str(e)}
+    return {'ok': True, **report}
+
+def cmd_duplicates(index: core.LauncherIndex, args) -> list:
+    resolved: dict = {}
+    groups = []
+    for group in core.find_duplicates(index.records.values()):
+        item = {'command': ' '.join(core.canonical_exec(group[0].entry.data['Exec'], resolved)), 'keep': group[0].desktop_id,
+                'redundant': [r.desktop_id for r in group[1:]], 'entries': [core.entry_json(r) for r in group]}
+        if args.retire:
+            item['retired'] = []
+            for rec in group[1:]:
+                try:
+                    action, path = core.retire_entry(rec.entry)
+                    index.refresh(rec.desktop_id)
+                    if path.name != rec.desktop_id: index.refresh(path.name)
+                    item['retired'].append(_result(rec.desktop_id, True, action=action, path=str(path)))
+                except Exception as e:
+                    item['retired'].append(_result(rec.desktop_id, False, error=str(e)))
+        groups.append(item)
+    return groups
+
+def cmd_health(index: core.LauncherIndex, args) -> list:
+    records = [r for r in index.records.values() if args.all or not r.entry.is_hidden()]
+    problems = core.HEALTH.check(records)
+    core.HEALTH.save()
+    return [{'id': r.desktop_id, 'path': str(r.path), 'ok': not problems.get(r.desktop_id), 'problems': problems.get(r.desktop_id, [])}
+            for r in sorted(records, key=lambda r: r.desktop_id) if args.include_ok or r.desktop_id in problems]
+
+def cmd_latency(index: core.LauncherIndex, args) -> list:
+    # Recorded by the GUI's Run button; without targets every launcher that was ever timed
+    results = []
+    for target in args.targets or core.LAUNCHES.ids():
+        rec = index.resolve_target(target)
+        desktop_id = rec.desktop_id if rec else target if target.endswith('.desktop') else target + '.desktop'
+        summary = core.LAUNCHES.summary(desktop_id)
+        if summary is None: results.append(_result(target, False, id=desktop_id, error='Never timed'))
+        else: results.append(_result(target, True, id=desktop_id, **summary, history=core.LAUNCHES.history(desktop_id)))
+    return results
+
+def cmd_apply(index: core.LauncherIndex, args) -> dict:
+    try:
+        manifest = core.load_manifest(pathlib.Path(args.manifest).expanduser())
+        plan = core.apply_manifest(manifest, dry_run=args.dry_run, prune=not args.no_prune, index=index)
+    except Exception as e:
+        return {'ok': False, 'error': str(e)}
+    counts = {a: sum(1 for step in plan if step['action'] == a) for a in ('create', 'update', 'remove', 'unchanged', 'conflict')}
+    return {'ok': not counts['conflict'], 'manifest': manifest['name'], 'dry_run': args.dry_run, **counts,
+            'changes': [step for step in plan if step['action'] != 'unchanged']}
+
+MUTATIONS = {'hide': _hide, 'unhide': _unhide, 'revert': _revert, 'delete': _delete}
+
+class _Parser(argparse.ArgumentParser):
+    """ArgumentParser whose help and usage errors go to the given streams instead of sys.stdout / sys.stderr."""
+    def __init__(self, *args, out=None, err=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.out, self.err = out, err
+
+    def _print_message(self, message, file=None):
+        file = (self.out or sys.stdout) if file is sys.stdout else (self.err or sys.stderr)
+        super()._print_message(message, file)
+
+def build_parser(out=None, err=None) -> argparse.ArgumentParser:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--pretty', action='store_true', help='indent JSON output')
+    common.add_argument('--profile', nargs='?', const='1', metavar='DEST',
+                        help="time phases and count files; summary on stderr, or JSON lines to DEST ('-' for stderr)")
+    parser = _Parser(prog='launcher_cli.py', description='Manage desktop launchers without the GUI; prints JSON.', out=out, err=err)
+    sub = parser.add_subparsers(dest='command', required=True, parser_class=functools.partial(_Parser, out=out, err=err))
+    add_parser = lambda name, **kw: sub.add_parser(name, parents=[common], **kw)
+    p = add_parser('list', help='list custom launchers (or all apps with --all)')
+    p.add_argument('--all', action='store_true', help='include system and Flatpak applications')
+    p = add_parser('search', help='ranked, typo-tolerant search over name, keywords, comment, exec and categories')
+    p.add_argument('query', nargs='+')
+    p.add_argument('--all', action='store_true', help='include system and Flatpak applications')
+    p = add_parser('add', help='create launchers for one or more files')
+    p.add_argument('files', nargs='+', metavar='FILE')
+    p.add_argument('--name', help='launcher name (single file only; default: derived from the file name)')
+    p.add_argument('--wrapper', default='Auto', choices=core.WRAPPERS)
+    p.add_argument('--args', default='', help='extra arguments appended to Exec')
+    p.add_argument('--comment', default='')
+    p.add_argument('--icon', default='', help='icon name or image file')
+    p.add_argument('--categories', default='', help='e.g. Utility;Development;')
+    p.add_argument('--terminal', action='store_true', help='run in a terminal')
+    p.add_argument('--no-chmod', action='store_true', help='do not mark the files executable')
+    p = add_parser('add-tree', help='create launchers for every script, ELF binary and AppImage in files and dirs (by shebang / magic bytes)')
+    p.add_argument('paths', nargs='+', metavar='PATH')
+    p.add_argument('--dry-run', action='store_true', help='print the proposed launchers without writing anything')
+    for name, help_text in (('hide', 'hide system apps (creates Hidden overrides)'), ('unhide', 'unhide hidden overrides'),
+                            ('revert', 'remove local overrides'), ('delete', 'delete custom launchers')):
+        p = add_parser(name, help=help_text)
+        p.add_argument('targets', nargs='+', metavar='TARGET')
+    p = add_parser('duplicates', help='group launchers that run the same command (normalized Exec)')
+    p.add_argument('--retire', action='store_true', help='hide (system) or delete (custom) every entry but the first of each group')
+    p = add_parser('health', help='report launchers whose program, script, TryExec or icon is missing')
+    p.add_argument('--all', action='store_true', help='also check hidden entries')
+    p.add_argument('--include-ok', action='store_true', help='list healthy launchers too')
+    p = add_parser('latency', help='startup latencies recorded by the Run button (median per Exec line)')
+    p.add_argument('targets', nargs='*', metavar='TARGET')
+    p = add_parser('apply', help='create, update and remove launchers to match a JSON manifest (only what differs)')
+    p.add_argument('manifest', metavar='MANIFEST')
+    p.add_argument('--dry-run', action='store_true', help='print the planned changes without writing anything')
+    p.add_argument('--no-prune', action='store_true', help='keep launchers of this manifest that it no longer lists')
+    p = add_parser('export', help='export all custom launchers and their icons to a .tar.gz archive')
+    p.add_argument('archive', metavar='ARCHIVE')
+    p = add_parser('import', help='import launchers from an exported archive')
+    p.add_argument('archive', metavar='ARCHIVE')
+    return parser
+
+def run_command(index: core.LauncherIndex, args):
+    if args.command == 'list': result = cmd_list(index, args)
+    elif args.command == 'search': result = cmd_search(index, args)
+    elif args.command in ('export', 'import'): result = cmd_archive(index, args)
+    elif args.command == 'apply': result = cmd_apply(index, args)
+    elif args.command == 'add-tree': result = cmd_add_tree(index, args)
+    elif args.command == 'health': result = cmd_health(index, args)
+    elif args.command == 'latency': result = cmd_latency(index, args)
+    elif args.command == 'duplicates':
+        with core.Transaction():
+            result = cmd_duplicates(index, args)
+    else:
+        with core.Transaction():  # one desktop-database refresh for all targets
+            result = cmd_add(index, args) if args.command == 'add' else _mutate(index, args.targets, MUTATIONS[args.command])
+    return result
+
+def main(argv: Optional[list[str]] = None, index: Optional[core.LauncherIndex] = None, out=None, err=None,
+         forwarded: bool = False) -> int:
+    """Run one CLI command. A warm index (e.g. from a running GUI) can be passed in to skip the scan.
+
+    Output, help and usage errors go to out / err (default sys.stdout / sys.stderr). A command forwarded to
+    the running GUI must leave its process-wide profiler alone: --profile is refused there.
+    """
+    parser = build_parser(out, err)
+    args = parser.parse_args(argv)
+    if args.command == 'add' and args.name and len(args.files) > 1:
+        parser.error('--name can only be used with a single FILE')
+    if args.profile and forwarded:
+        parser.error('--profile is not available in commands answered by the running window')
+    if args.profile: core.PROFILE.configure(args.profile)
+    if index is None:
+        with core.PROFILE.phase('load'):
+            index = core.LauncherIndex().load()
+    with core.PROFILE.phase(args.command):
+        result = run_command(index, args)
+    out = out or sys.stdout
+    json.dump(result, out, indent=2 if args.pretty else None, ensure_ascii=False); out.write('\n')
+    core.ENTRY_CACHE.save()
+    core.flush_pending()
+    if core.PROFILE.enabled and not forwarded:  # a GUI started with --profile keeps its summary to itself
+        if core.PROFILE.dest: core.PROFILE.emit(args.command)
+        else: print(core.PROFILE.summary(), file=err or sys.stderr)
+    if args.command in MUTATIONS or args.command == 'add':
+        return 0 if all(r['ok'] for r in result) else 1
+    if args.command in ('export', 'import', 'apply', 'add-tree'):
+        return 0 if result['ok'] else 1
+    if args.command in ('health', 'latency'):
+        return 0 if all(r['ok'] for r in result) else 1
+    if args.command == 'duplicates':
+        return 0 if all(r['ok'] for g in result for r in g.get('retired', ())) else 1
+    return 0
+
+def capture(argv: list[str], index: Optional[core.LauncherIndex] = None, forwarded: bool = False) -> tuple[int, str, str]:
+    """Run main() into buffers of its own (also --help and usage errors): (exit status, stdout, stderr).
+
+    sys.stdout and sys.stderr are left alone, so this is safe on a worker thread.
+    """
+    out, err = io.StringIO(), io.StringIO()
+    try:
+        status = main(argv, index, out, err, forwarded)
+    except SystemExit as e:
+        status = e.code if isinstance(e.code, int) else 0 if e.code is None else 2
+    return status, out.getvalue(), err.getvalue()
+
+def command_option(arg: str) -> bool:
+    """Whether a GUI argument is a CLI command in option form (--list, --search, --hide, ...)."""
+    return arg.startswith('--') and arg[2:] in COMMANDS
+
+def forward_to_instance(argv: list[str]) -> Optional[int]:
+    """Send a command line to the running GUI (GApplication command-line forwarding over the session bus).
+
+    Returns its exit status, or None if there is no running instance (or no bus, or a GLib that cannot send
+    output back); only Gio is loaded, never GTK.
+    """
+    try:
+        import gi
+        gi.require_version('Gio', '2.0')
+        from gi.repository import Gio, GLib
+    except (ImportError, ValueError):
+        return None
+    if not hasattr(Gio.ApplicationCommandLine, 'print_literal'):  # GLib < 2.80
+        return None
+    try:
+        bus = Gio.bus_get_sync(Gio.BusType.SESSION, None)
+        owned = bus.call_sync('org.freedesktop.DBus', '/org/freedesktop/DBus', 'org.freedesktop.DBus', 'NameHasOwner',
+                              GLib.Variant('(s)', (core.APP_ID,)), GLib.VariantType('(b)'), Gio.DBusCallFlags.NONE, 1000, None)
+    except GLib.Error:
+        return None
+    if not owned.unpack()[0]:
+        return None
+    app = Gio.Application(application_id=core.APP_ID, flags=Gio.ApplicationFlags.HANDLES_COMMAND_LINE)
+    # If the GUI quit in the meantime this process becomes the primary instance: answer locally then
+    app.connect('command-line', lambda _app, cmdline: main(to_cli_args(cmdline.get_arguments()[1:])))
+    return app.run([sys.argv[0]] + argv)
+
+def to_cli_args(argv: list[str]) -> list[str]:
+    """['--search', 'fire'] -> ['search', 'fire']"""
+    return [argv[0][2:]] + argv[1:]
+
+PATH_COMMANDS = ('add', 'add-tree', 'export', 'import', 'apply')  # positional arguments are file paths
+TEXT_OPTIONS = ('--name', '--wrapper', '--args', '--comment', '--categories')
+
+def main_from_gui(argv: list[str]) -> int:
+    """`app_launcher_manager.py --COMMAND ...`: ask the running instance, else scan here."""
+    if argv[0][2:] in PATH_COMMANDS:
+        # The running instance has its own working directory: pass file arguments absolute, existing or not (the
+        # export archive is created); --icon only when it names a file rather than a theme icon
+        argv = argv[:1] + [a if a.startswith('-') or prev in TEXT_OPTIONS
+                           or prev == '--icon' and not os.path.exists(os.path.expanduser(a))
+                           else os.path.abspath(os.path.expanduser(a)) for prev, a in zip(argv, argv[1:])]
+    # Profiling is for this call only: run it here rather than in the running instance
+    status = None if any(a.split('=')[0] == '--profile' for a in argv) else forward_to_instance(argv)
+    return main(to_cli_args(argv)) if status is None else status
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,1942 @@
+#!/usr/bin/env python3
+"""GTK-free core of App Drawer Manager: desktop-entry parsing, scanning, overlay resolution and launcher edits.
+
+Shared by the GTK front-end (app_launcher_manager.py) and the headless CLI (launcher_cli.py).
+"""
+import os, re, sys, stat, time, pathlib, json, shlex, threading, bisect
+# shutil, subprocess, tempfile, hashlib, datetime, tarfile and io are imported where used: they are not needed to
+# list launchers, and skipping them keeps startup (GUI and CLI) short
+from collections import Counter
+from typing import Optional
+
+APP_ID = 'com.example.AppDrawerManager'  # GApplication ID of the GUI; the CLI forwards commands to it
+CUSTOM_MARKER_KEY = 'X-Custom-Added'
+CUSTOM_MARKER_VALUE = '1'
+OVERRIDE_MARKER_KEY = 'X-Custom-Override'  # set on local copies created by Hide / Override & Edit
+MANIFEST_MARKER_KEY = 'X-Custom-Manifest'  # name of the manifest that owns a launcher (see apply_manifest)
+DATA_HOME = pathlib.Path(os.environ.get('XDG_DATA_HOME') or pathlib.Path.home()/'.local/share')
+LOCAL_APPS = DATA_HOME / 'applications'
+
+FLATPAK_EXPORT_DIRS = [
+    pathlib.Path('/var/lib/flatpak/exports/share'),
+    DATA_HOME/'flatpak/exports/share'
+]
+
+def xdg_app_dirs() -> list[pathlib.Path]:
+    """Application dirs in lookup precedence order: $XDG_DATA_HOME, then each of $XDG_DATA_DIRS.
+
+    The Flatpak export dirs are appended when the session did not put them in $XDG_DATA_DIRS.
+    """
+    data_dirs = [pathlib.Path(p) for p in (os.environ.get('XDG_DATA_DIRS') or '/usr/local/share:/usr/share').split(':') if p]
+    dirs = []
+    for base in [DATA_HOME] + data_dirs + FLATPAK_EXPORT_DIRS:
+        d = base / 'applications'
+        if d not in dirs: dirs.append(d)
+    return dirs
+
+SYSTEM_APP_DIRS = xdg_app_dirs()
+
+CACHE_DIR = pathlib.Path(os.environ.get('XDG_CACHE_HOME') or pathlib.Path.home()/'.cache') / 'app-drawer-manager'
+ENTRY_CACHE_FILE = CACHE_DIR / 'entries.json'
+ENTRY_CACHE_VERSION = 5
+SNAPSHOT_FILE = CACHE_DIR / 'snapshot.json'
+HEALTH_CACHE_FILE = CACHE_DIR / 'health.json'
+HEALTH_CACHE_VERSION = 1
+HEALTH_WORKERS = min(8, (os.cpu_count() or 2) * 2)
+LAUNCH_HISTORY_FILE = CACHE_DIR / 'launches.json'
+LAUNCH_HISTORY_SIZE = 20  # startup latencies kept per launcher
+ICON_THEME_DIR = DATA_HOME / 'icons/hicolor'
+ICON_DIR = ICON_THEME_DIR / '128x128/apps'  # where icons were copied before the content-addressed store
+ICON_PREFIX = 'adm-'  # stored icons are named adm-<content hash>; anything else in the theme is left alone
+ICON_SIZES = (48, 64, 128, 256)
+ICON_SIZE_DIRS = tuple(f'{n}x{n}' for n in ICON_SIZES) + ('scalable',)
+# Ranking weight per searchable key (localized variants such as Name[de] count slightly less)
+SEARCH_WEIGHTS = {'Name': 10.0, 'GenericName': 6.0, 'Keywords': 5.0, 'Comment': 2.0, 'Categories': 1.5, 'Exec': 1.0}
+LOCALIZED_WEIGHT = 0.9
+ARCHIVE_MANIFEST = 'manifest.json'
+ARCHIVE_VERSION = 1
+MANIFEST_VERSION = 1
+MANIFEST_FIELDS = ('Name', 'Exec', 'Comment', 'Icon', 'Categories', 'Terminal')  # what a manifest entry decides
+
+WRAPPERS = ['Auto','Direct','python3','python','bash','sh','node']
+SCRIPT_WRAPPERS = {'.py': 'python3', '.sh': 'bash', '.bash': 'bash', '.js': 'node', '.pl': 'perl', '.rb': 'ruby',
+                   '.lua': 'lua', '.php': 'php', '.zsh': 'zsh', '.fish': 'fish'}
+INTERPRETER_RE = re.compile(r'(python|perl|ruby|node|bash|sh|dash|zsh|fish|lua|php)[\d.]*$')  # programs whose first argument is a script
+SNIFF_BYTES = 256  # enough for a shebang line and the ELF / AppImage magic
+DROP_MAX_FILES = 5000  # files looked at per dropped set (dropping a home dir must not walk it all)
+DROP_SKIP_DIRS = {'__pycache__', 'node_modules', 'site-packages', 'venv'}  # plus every hidden dir
+_SHARED_LIB_RE = re.compile(r'\.so(\.\d+)*$')
+
+PROFILE_ENV = 'ADM_PROFILE'  # '1': summary only; '-': JSON lines on stderr; anything else: JSON lines appended to that file
+
+class _Phase:
+    __slots__ = ('profiler', 'name', 'start')
+    def __init__(self, profiler: 'Profiler', name: str):
+        self.profiler = profiler; self.name = name
+    def __enter__(self):
+        self.start = time.perf_counter()
+    def __exit__(self, *_):
+        self.profiler.add_time(self.name, time.perf_counter() - self.start)
+
+class _NoPhase:
+    __slots__ = ()
+    def __enter__(self): pass
+    def __exit__(self, *_): pass
+
+_NO_PHASE = _NoPhase()
+
+class Profiler:
+    """Phase timers and counters for slowness reports. Off by default; when off, phase() returns a shared no-op
+    context and count() is a single attribute check.
+
+        with PROFILE.phase('parse'): ...
+        PROFILE.count('files_parsed')
+    """
+    def __init__(self):
+        self.enabled = False
+        self.dest: Optional[str] = None  # None: summary only
+        self.lock = threading.Lock()
+        self.times: dict[str, list] = {}  # phase -> [calls, seconds]
+        self.counters: Counter = Counter()
+
+    def configure(self, spec: Optional[str]):
+        """Enable from an ADM_PROFILE / --profile value ('' or None disables)."""
+        self.enabled = bool(spec) and spec != '0'
+        self.dest = spec if self.enabled and spec not in ('1', 'summary') else None
+
+    def phase(self, name: str):
+        return _Phase(self, name) if self.enabled else _NO_PHASE
+
+    def add_time(self, name: str, seconds: float):
+        with self.lock:
+            t = self.times.setdefault(name, [0, 0.0]); t[0] += 1; t[1] += seconds
+
+    def count(self, name: str, n: int = 1):
+        if self.enabled:
+            with self.lock: self.counters[name] += n
+
+    def reset(self):
+        with self.lock:
+            self.times.clear(); self.counters.clear()
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {'phases': {k: {'calls': c, 'ms': round(sec * 1000, 3)} for k, (c, sec) in self.times.items()},
+                    'counters': dict(self.counters)}
+
+    def summary(self, phases: tuple = ()) -> str:
+        """One line for a status bar: the given phases (default: all) in ms, then the counters."""
+        snap = self.snapshot()
+        parts = [f"{k} {v['ms']:.0f} ms" for k, v in snap['phases'].items() if not phases or k in phases]
+        parts += [f'{k.replace("_", " ")} {v}' for k, v in sorted(snap['counters'].items())]
+        return ' · '.join(parts)
+
+    def emit(self, event: str, **extra):
+        """Write one JSON line (event name, wall clock, phases, counters) to the configured destination."""
+        if not self.enabled or not self.dest: return
+        line = json.dumps({'event': event, 'time': round(time.time(), 3), **extra, **self.snapshot()}, separators=(',', ':'))
+        try:
+            if self.dest == '-':
+                sys.stderr.write(line + '\n'); sys.stderr.flush()
+            else:
+                with open(self.dest, 'a', encoding='utf-8') as f: f.write(line + '\n')
+        except OSError as e:
+            print('Profile output error', e)
+
+PROFILE = Profiler()
+PROFILE.configure(os.environ.get(PROFILE_ENV))
+
+# Keys kept in memory per entry: what the list, overlay, duplicate and health checks read
+LIST_KEYS = frozenset({'Name', 'Icon', 'Exec', 'TryExec', 'Type', 'Terminal', 'Categories', 'Hidden', 'NoDisplay',
+                       'OnlyShowIn', 'NotShowIn', CUSTOM_MARKER_KEY, OVERRIDE_MARKER_KEY, MANIFEST_MARKER_KEY})
+# Values shared by many entries; interned so thousands of entries point at one string
+INTERNED_VALUE_KEYS = LIST_KEYS - {'Name', 'Icon', 'Exec', 'TryExec'}
+# Keys read by the header pass: the list keys plus the searchable text (kept only as search terms)
+HEADER_KEYS = LIST_KEYS | {'GenericName', 'Keywords', 'Comment'}
+LOCALIZED_HEADER_KEYS = frozenset({'Name', 'GenericName', 'Keywords', 'Comment'})
+_LIST_KEY = {k: sys.intern(k) for k in LIST_KEYS}
+_WEIGHTS: dict[float, float] = {}  # one float object per distinct search weight
+
+def read_entry_header(lines) -> dict:
+    """Header pass: the list/search keys of the [Desktop Entry] group. Stops reading at the next group."""
+    d = {}
+    in_entry = False
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'): continue
+        if line.startswith('[') and line.endswith(']'):
+            if in_entry: break
+            in_entry = line == '[Desktop Entry]'
+            continue
+        if in_entry and '=' in line:
+            k, v = line.split('=', 1)
+            k = k.strip()
+            base, _, locale = k.partition('[')
+            if k in HEADER_KEYS or (locale and base in LOCALIZED_HEADER_KEYS):
+                d[k] = v.strip()
+    return d
+
+def compact_data(header: dict) -> dict:
+    """The LIST_KEYS of a header dict, with interned keys and common values."""
+    data = {}
+    for k, v in header.items():
+        key = _LIST_KEY.get(k)
+        if key is not None: data[key] = sys.intern(v) if key in INTERNED_VALUE_KEYS else v
+    return data
+
+def _intern_values(data: dict) -> dict:
+    # compact_data() for dicts that already hold only LIST_KEYS (cache and snapshot files), in place
+    for k, v in data.items():
+        if k in INTERNED_VALUE_KEYS: data[k] = sys.intern(v)
+    return data
+
+def search_terms(header: dict) -> tuple:
+    """Flat (token, weight, token, weight, ...) of the searchable fields; tokens are interned."""
+    weights: dict[str, float] = {}
+    for key, value in header.items():
+        base, _, locale = key.partition('[')
+        w = SEARCH_WEIGHTS.get(base)
+        if w is None or not value: continue
+        if locale: w *= LOCALIZED_WEIGHT
+        for tok in _TOKEN_RE.findall(value.lower()):
+            if weights.get(tok, 0) < w: weights[tok] = w
+    flat = [t for kv in weights.items() for t in kv]
+    return intern_terms(flat)
+
+def intern_terms(flat: list) -> tuple:
+    """Tuple of a flat token/weight list (e.g. from JSON) with shared token and weight objects."""
+    weights = flat[1::2]
+    flat[::2] = map(sys.intern, flat[::2])
+    flat[1::2] = map(_WEIGHTS.setdefault, weights, weights)
+    return tuple(flat)
+
+class DesktopFile:
+    """Lossless desktop file: every group, key, comment and blank line is kept in order.
+
+    Used when an entry is edited or copied; the list only needs read_entry_header(). to_text() reproduces
+    the original text exactly until a key is changed, and changed keys stay where they were.
+    """
+    MAIN = 'Desktop Entry'
+
+    def __init__(self, text: str = ''):
+        self.groups: list[list] = [[None, []]]  # [group name or None for the preamble, raw lines with line endings]
+        for line in text.splitlines(keepends=True):
+            stripped = line.strip()
+            if stripped.startswith('[') and stripped.endswith(']'):
+                self.groups.append([stripped[1:-1], [line]])
+            else:
+                self.groups[-1][1].append(line)
+
+    @classmethod
+    def load(cls, path: pathlib.Path) -> 'DesktopFile':
+        return cls(path.read_text(encoding='utf-8'))
+
+    def to_text(self) -> str:
+        return ''.join(line for _, lines in self.groups for line in lines)
+
+    def save(self, path: pathlib.Path):
+        write_file(path, self.to_text())
+
+    def group_names(self) -> list[str]:
+        return [name for name, _ in self.groups if name is not None]
+
+    def has_group(self, group: str = MAIN) -> bool:
+        return self._group(group) is not None
+
+    def _group(self, group: str) -> Optional[list]:
+        for g in self.groups:
+            if g[0] == group: return g[1]
+        return None
+
+    @staticmethod
+    def _key_of(line: str) -> Optional[str]:
+        stripped = line.strip()
+        if not stripped or stripped.startswith('#') or '=' not in stripped: return None
+        return stripped.split('=', 1)[0].strip()
+
+    def get(self, key: str, group: str = MAIN, default: Optional[str] = None) -> Optional[str]:
+        for line in self._group(group) or ():
+            if self._key_of(line) == key:
+                return line.split('=', 1)[1].strip()
+        return default
+
+    def items(self, group: str = MAIN) -> list[tuple[str, str]]:
+        return [(k, line.split('=', 1)[1].strip()) for line in self._group(group) or () if (k := self._key_of(line))]
+
+    def set(self, key: str, value: str, group: str = MAIN):
+        """Replace key in place (keeping its line ending), or add it after the last entry of the group."""
+        lines = self._group(group)
+        if lines is None:
+            if self.groups[-1][1] and not self.groups[-1][1][-1].endswith('\n'): self.groups[-1][1][-1] += '\n'
+            lines = [f'[{group}]\n']
+            if group == self.MAIN:  # the main group must come first
+                self.groups.insert(1, [group, lines])
+            else:
+                self.groups.append([group, lines])
+        for i, line in enumerate(lines):
+            if self._key_of(line) == key:
+                ending = line[len(line.rstrip('\r\n')):] or '\n'
+                lines[i] = f'{key}={value}{ending}'
+                return
+        at = len(lines)
+        while at > 1 and not lines[at - 1].strip(): at -= 1
+        if not lines[at - 1].endswith('\n'): lines[at - 1] += '\n'
+        lines.insert(at, f'{key}={value}\n')
+
+    def remove(self, key: str, group: str = MAIN) -> bool:
+        lines = self._group(group)
+        if lines is None: return False
+        kept = [line for line in lines if self._key_of(line) != key]
+        if len(kept) == len(lines): return False
+        lines[:] = kept
+        return True
+
+class DesktopEntry:
+    """A launcher as the list sees it: its LIST_KEYS and its search terms, nothing else.
+
+    Comment, GenericName, Keywords and translations are only kept as search terms; full() reads them from the
+    file when an editor needs them.
+    """
+    __slots__ = ('path', 'data', 'terms')
+    def __init__(self, path: pathlib.Path, data: Optional[dict] = None, terms: tuple = ()):
+        self.path = path
+        if data is None:
+            header = self.full()
+            data, terms = compact_data(header), search_terms(header)
+        self.data = data
+        self.terms = terms
+
+    def full(self) -> dict:
+        """Every header key of the file as it is on disk now ({} if it cannot be read)."""
+        try:
+            with self.path.open('r', encoding='utf-8') as f:
+                return read_entry_header(f)
+        except Exception as e:
+            print('Parse error', e)
+        return {}
+
+    def is_custom(self):
+        return self.data.get(CUSTOM_MARKER_KEY) == CUSTOM_MARKER_VALUE
+
+    def is_local(self):
+        try:
+            return str(self.path).startswith(str(LOCAL_APPS))
+        except Exception:
+            return False
+
+    def display_name(self):
+        return self.data.get('Name', self.path.name)
+
+    def icon_name(self):
+        return self.data.get('Icon')
+
+    def is_hidden(self):
+        val_hidden = self.data.get('Hidden','').lower() == 'true'
+        val_nodisplay = self.data.get('NoDisplay','').lower() == 'true'
+        return val_hidden or val_nodisplay
+
+def normalize_exec(exec_cmd: str) -> str:
+    """Canonical key for an Exec line, insensitive to quoting style and whitespace."""
+    exec_cmd = exec_cmd.strip()
+    if '"' not in exec_cmd and "'" not in exec_cmd and '\\' not in exec_cmd:
+        return '\0'.join(exec_cmd.split())  # what shlex would return (see exec_argv)
+    try:
+        return '\0'.join(shlex.split(exec_cmd))
+    except ValueError:
+        return '\0'.join(exec_cmd.split())
+
+class EntryCache:
+    """Persistent index of parsed [Desktop Entry] groups.
+
+    Directory listings are reused while the directory mtime is unchanged; a file is re-parsed only when its
+    mtime or size changed. Files that are never looked up (e.g. shadowed ones) are never parsed.
+    """
+    def __init__(self, path: pathlib.Path = ENTRY_CACHE_FILE):
+        self.path = path
+        self.dirs: dict[str, dict] = {}  # dir -> {'mtime': ns, 'names': [...], 'files': {name: [mtime_ns, size, data, terms]}}
+        self.dirty = False
+        self.lock = threading.Lock()  # used from worker threads as well as the main loop; parsing happens outside it
+        self._load()
+
+    def _load(self):
+        try:
+            raw = json.loads(self.path.read_text(encoding='utf-8'))
+            if raw.get('version') == ENTRY_CACHE_VERSION:
+                self.dirs = raw.get('dirs', {})
+                for rec in self.dirs.values():
+                    for cached in rec['files'].values():
+                        cached[2] = _intern_values(cached[2]); cached[3] = intern_terms(cached[3])
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print('Cache load error', e)
+
+    def save(self):
+        with self.lock:
+            if not self.dirty: return
+            payload = json.dumps({'version': ENTRY_CACHE_VERSION, 'dirs': self.dirs}, separators=(',',':'))
+            self.dirty = False
+        try:
+            atomic_write(self.path, payload)
+        except Exception as e:
+            print('Cache save error', e)
+
+    def listing(self, d: pathlib.Path) -> list[str]:
+        """Names of the .desktop files in d; a readdir only happens when the directory mtime changed."""
+        key = str(d)
+        try:
+            dir_mtime = d.stat().st_mtime_ns
+        except OSError:
+            with self.lock:
+                if self.dirs.pop(key, None) is not None: self.dirty = True
+            return []
+        with self.lock:
+            rec = self.dirs.get(key)
+            if rec and rec['mtime'] == dir_mtime:
+                PROFILE.count('listings_cached')
+                return list(rec['names'])
+        PROFILE.count('dirs_listed')
+        with PROFILE.phase('readdir'):
+            try: names = sorted(n for n in os.listdir(d) if n.endswith('.desktop') and not n.startswith('.'))
+            except OSError: names = []
+        with self.lock:
+            old_files = rec['files'] if rec else {}
+            self.dirs[key] = {'mtime': dir_mtime, 'names': names, 'files': {n: old_files[n] for n in names if n in old_files}}
+            self.dirty = True
+        return names
+
+    def get(self, p: pathlib.Path) -> Optional[DesktopEntry]:
+        """Entry for a single file (None if it is gone), re-parsed only if its mtime or size changed."""
+        PROFILE.count('files_stated')
+        try:
+            st = os.stat(p)
+        except OSError:
+            with self.lock:
+                rec = self.dirs.get(str(p.parent))
+                if rec and rec['files'].pop(p.name, None) is not None: self.dirty = True
+            return None
+        with self.lock:
+            rec = self.dirs.get(str(p.parent))
+            cached = rec['files'].get(p.name) if rec else None
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            PROFILE.count('cache_hits')
+            return DesktopEntry(p, cached[2], cached[3])
+        PROFILE.count('files_parsed')
+        with PROFILE.phase('parse'):
+            entry = DesktopEntry(p)
+        with self.lock:
+            rec = self.dirs.get(str(p.parent))
+            if rec is not None:
+                rec['files'][p.name] = [st.st_mtime_ns, st.st_size, entry.data, entry.terms]; self.dirty = True
+        return entry
+
+    def scan(self, d: pathlib.Path, cancel: Optional[threading.Event] = None) -> list[DesktopEntry]:
+        """Entries for every .desktop file in d. A set cancel event aborts the scan and returns []."""
+        entries = []
+        for name in self.listing(d):
+            if cancel is not None and cancel.is_set():
+                return []
+            entry = self.get(d / name)
+            if entry is not None: entries.append(entry)
+        return entries
+
+class OverlayRecord:
+    """How one desktop ID resolves across the app dirs: the effective file and every file it shadows."""
+    __slots__ = ('desktop_id', 'path', 'shadows', 'entry')
+    def __init__(self, desktop_id: str, path: pathlib.Path):
+        self.desktop_id = desktop_id
+        self.path = path
+        self.shadows: list[pathlib.Path] = []
+        self.entry: Optional[DesktopEntry] = None  # parsed lazily; shadowed files are never parsed
+
+    def is_local(self) -> bool:
+        return self.path.parent == LOCAL_APPS
+
+    def is_override(self) -> bool:
+        return self.is_local() and bool(self.shadows)
+
+    def is_hidden(self) -> bool:
+        return self.entry is not None and self.entry.is_hidden()
+
+    def is_orphaned(self) -> bool:
+        """A local override (Hide / Override & Edit copy) whose system entry is no longer installed."""
+        if not self.is_local() or self.shadows or self.entry is None or not self.entry.is_custom():
+            return False
+        return self.entry.data.get(OVERRIDE_MARKER_KEY) == '1' or self.entry.data.get('Hidden','').lower() == 'true'
+
+def build_overlay_index(dirs: list[pathlib.Path], cache: 'EntryCache') -> dict[str, OverlayRecord]:
+    """Resolve every desktop ID from one listing per dir; the first dir (highest precedence) wins."""
+    index: dict[str, OverlayRecord] = {}
+    for d in dirs:
+        for name in cache.listing(d):
+            rec = index.get(name)
+            if rec is None: index[name] = OverlayRecord(name, d / name)
+            else: rec.shadows.append(d / name)
+    return index
+
+def resolve_overlay(desktop_id: str, dirs: list[pathlib.Path], cache: 'EntryCache') -> Optional[OverlayRecord]:
+    """Re-resolve a single desktop ID (used for incremental refreshes) and parse its effective file."""
+    rec = None
+    for d in dirs:
+        p = d / desktop_id
+        if rec is None:
+            entry = cache.get(p)
+            if entry is not None:
+                rec = OverlayRecord(desktop_id, p); rec.entry = entry
+        elif p.exists():
+            rec.shadows.append(p)
+    return rec
+
+def save_snapshot(records, dirs: list[pathlib.Path], path: pathlib.Path = SNAPSHOT_FILE):
+    """Write the resolved list (IDs, paths, shadows, list keys) so the next start can show it before scanning."""
+    entries = [[r.desktop_id, str(r.path), [str(p) for p in r.shadows], r.entry.data] for r in records if r.entry is not None]
+    payload = {'version': ENTRY_CACHE_VERSION, 'dirs': [str(d) for d in dirs], 'entries': entries}
+    try:
+        atomic_write(path, json.dumps(payload, separators=(',', ':'), ensure_ascii=False))
+    except Exception as e:
+        print('Snapshot save error', e)
+
+def load_snapshot(dirs: list[pathlib.Path], path: pathlib.Path = SNAPSHOT_FILE) -> list[OverlayRecord]:
+    """Records from the last session's snapshot without touching any .desktop file ([] if missing or stale).
+
+    The list may be out of date; callers show it right away and reconcile it with a real scan. The entries have no
+    search terms: they are only needed once the scan has confirmed an entry, and it brings them from the cache.
+    """
+    try:
+        raw = json.loads(path.read_text(encoding='utf-8'))
+    except FileNotFoundError:
+        return []
+    except Exception as e:
+        print('Snapshot load error', e)
+        return []
+    if raw.get('version') != ENTRY_CACHE_VERSION or raw.get('dirs') != [str(d) for d in dirs]:
+        return []
+    records = []
+    for desktop_id, p, shadows, data in raw.get('entries', ()):
+        rec = OverlayRecord(desktop_id, pathlib.Path(p))
+        rec.shadows = [pathlib.Path(s) for s in shadows]
+        rec.entry = DesktopEntry(rec.path, _intern_values(data))
+        records.append(rec)
+    return records
+
+ENTRY_CACHE = EntryCache()
+
+_TOKEN_RE = re.compile(r'\w+')
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """True if b is a one-character insertion, deletion, substitution or transposition away from a."""
+    if a == b: return True
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1: return False
+    i = 0
+    while i < min(la, lb) and a[i] == b[i]: i += 1
+    if la == lb:
+        if a[i+1:] == b[i+1:]: return True
+        return i + 1 < la and a[i] == b[i+1] and a[i+1] == b[i] and a[i+2:] == b[i+2:]
+    return a[i:] == b[i+1:] if la < lb else a[i+1:] == b[i:]
+
+def _grams(token: str) -> set[str]:
+    """Trigrams of a token padded with one space on each side (boundary grams help typo matching)."""
+    padded = f' {token} '
+    return {padded[i:i+3] for i in range(len(padded) - 2)}
+
+class SearchIndex:
+    """Token and trigram index over the searchable fields of every entry, for ranked, typo-tolerant search.
+
+    Built once per scan and updated per desktop ID. A query term matches a token exactly, as a prefix
+    (bisect over the sorted vocabulary), as a substring or, failing that, by trigram similarity.
+    """
+    FUZZY_MIN_DICE = 0.5
+    FUZZY_MAX_TOKENS = 32  # per query term, the tokens sharing the most trigrams with it
+
+    def __init__(self):
+        self.postings: dict[str, dict[str, float]] = {}  # token -> {doc_id: best field weight}
+        self.vocabulary: list[str] = []  # sorted tokens, for prefix lookups
+        self.trigrams: dict[str, set[str]] = {}  # trigram -> tokens
+        self.doc_tokens: dict[str, tuple[str, ...]] = {}
+        self.names: dict[str, str] = {}  # doc_id -> lowercase Name, used as tie-breaker
+
+    def __len__(self):
+        return len(self.doc_tokens)
+
+    def copy(self) -> 'SearchIndex':
+        """Independent index over the same documents (the token and term tuples are shared, they never change)."""
+        other = SearchIndex()
+        other.postings = {tok: dict(docs) for tok, docs in self.postings.items()}
+        other.vocabulary = list(self.vocabulary)
+        other.trigrams = {g: set(toks) for g, toks in self.trigrams.items()}
+        other.doc_tokens = dict(self.doc_tokens); other.names = dict(self.names)
+        return other
+
+    def add(self, doc_id: str, terms: tuple, name: str):
+        """Index a document from its search_terms() and its Name."""
+        self.remove(doc_id)
+        it = iter(terms)
+        for tok, w in zip(it, it):
+            docs = self.postings.get(tok)
+            if docs is None:
+                docs = self.postings[tok] = {}
+                bisect.insort(self.vocabulary, tok)
+                for g in _grams(tok): self.trigrams.setdefault(g, set()).add(tok)
+            docs[doc_id] = w
+        self.doc_tokens[doc_id] = terms[::2]
+        self.names[doc_id] = name.lower()
+
+    def remove(self, doc_id: str):
+        for tok in self.doc_tokens.pop(doc_id, ()):
+            docs = self.postings[tok]
+            docs.pop(doc_id, None)
+            if docs: continue
+            del self.postings[tok]
+            del self.vocabulary[bisect.bisect_left(self.vocabulary, tok)]
+            for g in _grams(tok):
+                toks = self.trigrams[g]; toks.discard(tok)
+                if not toks: del self.trigrams[g]
+        self.names.pop(doc_id, None)
+
+    def _expand(self, term: str) -> dict[str, float]:
+        """Tokens matching one query term, with a match quality in (0, 1]."""
+        found: dict[str, float] = {}
+        if term in self.postings: found[term] = 1.0
+        i = bisect.bisect_left(self.vocabulary, term)
+        while i < len(self.vocabulary) and self.vocabulary[i].startswith(term):
+            tok = self.vocabulary[i]
+            if tok != term: found[tok] = 0.6 + 0.3 * len(term) / len(tok)
+            i += 1
+        if len(term) < 3:
+            return found
+        grams = _grams(term); inner = {g for g in grams if ' ' not in g}
+        # Substrings contain every inner trigram: look for them among the tokens of the rarest one only
+        rarest = min((self.trigrams.get(g, ()) for g in inner), key=len, default=())
+        for tok in rarest:
+            if tok not in found and term in tok: found[tok] = 0.55  # substring ("fox" in "firefox")
+        counts = Counter(tok for g in grams for tok in self.trigrams.get(g, ()))
+        scored = 0
+        for tok, shared in counts.most_common():
+            if tok in found: continue
+            if scored < self.FUZZY_MAX_TOKENS:  # the closest candidates come first
+                scored += 1
+                dice = 2 * shared / (len(grams) + len(_grams(tok)))
+                if dice >= self.FUZZY_MIN_DICE: found[tok] = 0.5 * dice; continue
+            if _within_one_edit(term, tok): found[tok] = 0.3  # short-word typo ("txt" -> "text")
+        return found
+
+    def scores(self, query: str) -> dict[str, float]:
+        """{doc_id: score} for docs matching every term of query, unordered (see query for the ranking)."""
+        query = query.strip().lower()
+        terms = _TOKEN_RE.findall(query)
+        if not terms: return {}
+        # Rarest term first: later terms only look up the docs that are still in the running
+        expanded = sorted((self._expand(term) for term in terms),
+                          key=lambda found: sum(len(self.postings[tok]) for tok in found))
+        scores: Optional[dict[str, float]] = None
+        for found in expanded:
+            best: dict[str, float] = {}
+            for tok, quality in found.items():
+                docs = self.postings[tok]
+                if not best and scores is None:
+                    best = {doc_id: quality * w for doc_id, w in docs.items()}; continue
+                if scores is None: ids = docs
+                elif len(scores) < len(docs): ids = [d for d in scores if d in docs]
+                else: ids = [d for d in docs if d in scores]
+                for doc_id in ids:
+                    s = quality * docs[doc_id]
+                    if s > best.get(doc_id, 0): best[doc_id] = s
+            if scores is None: scores = best
+            else: scores = {d: sc + best[d] for d, sc in scores.items() if d in best}
+            if not scores: return {}
+        for doc_id in scores:
+            if self.names[doc_id].startswith(query): scores[doc_id] += SEARCH_WEIGHTS['Name']
+        return scores
+
+    def query(self, query: str) -> list[tuple[str, float]]:
+        """(doc_id, score) for docs matching every term of query, best first (ties by name)."""
+        scores = self.scores(query)
+        ranked = sorted(scores, key=self.names.__getitem__)  # two stable sorts with C-level keys: no tuples
+        ranked.sort(key=scores.__getitem__, reverse=True)
+        return [(doc_id, scores[doc_id]) for doc_id in ranked]
+
+FACETS = ('category', 'source', 'state')
+FACET_STATES = ('custom', 'override', 'hidden', 'broken')
+
+_SOURCE_LABELS: dict[str, str] = {}
+
+def source_label(app_dir: str) -> str:
+    """Short name of the app dir a launcher comes from: Local, System/User Flatpak or the data dir."""
+    label = _SOURCE_LABELS.get(app_dir)
+    if label is None:
+        d = pathlib.Path(app_dir)
+        if d == LOCAL_APPS: label = 'Local'
+        elif d == FLATPAK_EXPORT_DIRS[0] / 'applications': label = 'System Flatpak'
+        elif d == FLATPAK_EXPORT_DIRS[1] / 'applications': label = 'User Flatpak'
+        else: label = str(d.parent)
+        label = _SOURCE_LABELS[app_dir] = sys.intern(label)
+    return label
+
+def record_facets(rec: OverlayRecord, broken: bool = False) -> dict[str, tuple[str, ...]]:
+    """Facet values of a resolved desktop ID, from the data already in memory (nothing is read from disk)."""
+    entry = rec.entry
+    categories = tuple(dict.fromkeys(sys.intern(c) for c in entry.data.get('Categories', '').split(';') if c))
+    source = source_label(str(rec.path).rpartition('/')[0])  # str(path) is cached, .parent is not
+    state = []
+    if entry.is_custom(): state.append('custom')
+    if source == 'Local' and rec.shadows: state.append('override')
+    if entry.is_hidden(): state.append('hidden')
+    if broken: state.append('broken')
+    return {'category': categories or ('Uncategorized',), 'source': (source,), 'state': tuple(state)}
+
+class FacetIndex:
+    """Live counts of every facet value, kept in step with the list one desktop ID at a time.
+
+    Values are OR-ed within a facet and AND-ed across facets, so a selection is checked against the
+    facets of one item without touching the others.
+    """
+    def __init__(self):
+        self.docs: dict[str, dict[str, tuple[str, ...]]] = {}
+        self.counts: dict[str, Counter] = {f: Counter() for f in FACETS}
+
+    def add(self, doc_id: str, facets: dict[str, tuple[str, ...]]):
+        self.remove(doc_id)
+        self.docs[doc_id] = facets
+        for facet, values in facets.items(): self.counts[facet].update(values)
+
+    def remove(self, doc_id: str):
+        facets = self.docs.pop(doc_id, None)
+        if facets is None: return
+        for facet, values in facets.items():
+            counts = self.counts[facet]
+            for v in values:
+                counts[v] -= 1
+                if counts[v] <= 0: del counts[v]
+
+    def values(self, facet: str) -> list[tuple[str, int]]:
+        """(value, count) pairs of one facet, most common first (states in their fixed order)."""
+        counts = self.counts[facet]
+        if facet == 'state': return [(v, counts[v]) for v in FACET_STATES if counts[v]]
+        return sorted(counts.items(), key=lambda kv: (-kv[1], kv[0].lower()))
+
+    @staticmethod
+    def matches(facets: dict[str, tuple[str, ...]], selected: dict[str, set[str]]) -> bool:
+        return all(not wanted or not wanted.isdisjoint(facets[f]) for f, wanted in selected.items())
+
+class LauncherIndex:
+    """In-memory model of every resolved desktop ID plus a normalized-Exec index for O(1) duplicate checks."""
+    def __init__(self, dirs: Optional[list[pathlib.Path]] = None, cache: Optional[EntryCache] = None):
+        self.dirs = dirs if dirs is not None else SYSTEM_APP_DIRS
+        self.cache = cache if cache is not None else ENTRY_CACHE
+        self.records: dict[str, OverlayRecord] = {}
+        self.exec_index: dict[str, list[OverlayRecord]] = {}
+        self.search_index = SearchIndex()
+
+    def load(self, cancel: Optional[threading.Event] = None) -> 'LauncherIndex':
+        """Synchronous full scan (the GUI streams the same two passes from a worker thread instead)."""
+        self.clear()
+        for rec in build_overlay_index(self.dirs, self.cache).values():
+            if cancel is not None and cancel.is_set():
+                break
+            rec.entry = self.cache.get(rec.path)
+            if rec.entry is not None: self.add(rec)
+        self.cache.save()
+        return self
+
+    def clear(self):
+        self.records = {}; self.exec_index = {}; self.search_index = SearchIndex()
+
+    def fork(self) -> 'LauncherIndex':
+        """Copy that another thread can query and update while this one keeps changing (records are shared)."""
+        other = LauncherIndex(self.dirs, self.cache)
+        other.records = dict(self.records)
+        other.exec_index = {key: list(bucket) for key, bucket in self.exec_index.items()}
+        other.search_index = self.search_index.copy()
+        return other
+
+    def add(self, rec: OverlayRecord):
+        self.remove(rec.desktop_id)
+        self.records[rec.desktop_id] = rec
+        key = normalize_exec(rec.entry.data.get('Exec', ''))
+        if key: self.exec_index.setdefault(key, []).append(rec)
+        self.search_index.add(rec.desktop_id, rec.entry.terms, rec.entry.data.get('Name', rec.desktop_id))
+
+    def remove(self, desktop_id: str) -> Optional[OverlayRecord]:
+        rec = self.records.pop(desktop_id, None)
+        if rec is not None:
+            key = normalize_exec(rec.entry.data.get('Exec', ''))
+            bucket = self.exec_index.get(key)
+            if bucket and rec in bucket:
+                bucket.remove(rec)
+                if not bucket: del self.exec_index[key]
+            self.search_index.remove(desktop_id)
+        return rec
+
+    def refresh(self, desktop_id: str) -> Optional[OverlayRecord]:
+        """Re-resolve one desktop ID after a change on disk."""
+        rec = resolve_overlay(desktop_id, self.dirs, self.cache)
+        if rec is None: self.remove(desktop_id)
+        else: self.add(rec)
+        return rec
+
+    def find_custom_by_exec(self, exec_cmd: str) -> Optional[DesktopEntry]:
+        for rec in self.exec_index.get(normalize_exec(exec_cmd), ()):
+            if rec.entry.is_custom() and rec.entry.is_local():
+                return rec.entry
+        return None
+
+    def find_system_by_exec(self, exec_cmd: str) -> Optional[DesktopEntry]:
+        for rec in self.exec_index.get(normalize_exec(exec_cmd), ()):
+            if not rec.entry.is_local():
+                return rec.entry
+        return None
+
+    def resolve_target(self, target: str) -> Optional[OverlayRecord]:
+        """Look up a desktop ID ('firefox.desktop' or 'firefox') or a path to a .desktop file."""
+        if '/' in target:
+            p = pathlib.Path(target).expanduser()
+            rec = self.records.get(p.name)
+            if rec is not None and rec.path == p: return rec
+            entry = self.cache.get(p)
+            if entry is None: return None
+            rec = OverlayRecord(p.name, p); rec.entry = entry
+            return rec
+        rec = self.records.get(target) or self.records.get(f'{target}.desktop')
+        if rec is None:
+            # Fall back to a unique case-insensitive ID match ('run' -> 'Run.desktop')
+            wanted = {target.lower(), f'{target.lower()}.desktop'}
+            matches = [r for i, r in self.records.items() if i.lower() in wanted]
+            if len(matches) == 1: rec = matches[0]
+        return rec
+
+    def search(self, query: str = '', show_all: bool = True) -> list[OverlayRecord]:
+        """Records matching query, best match first (all records by name for an empty query)."""
+        wanted = lambda r: show_all or (r.entry.is_custom() and r.entry.is_local())
+        if not query.strip():
+            found = [r for r in self.records.values() if wanted(r)]
+            found.sort(key=lambda r: r.entry.display_name().lower())
+            return found
+        return [r for doc_id, _ in self.search_index.query(query) if wanted(r := self.records[doc_id])]
+
+_FIELD_CODE_RE = re.compile(r'%(.)')
+FIELD_CODES = frozenset('fFuUdDnNickvm')
+
+def exec_argv(exec_cmd: str) -> list[str]:
+    """Argument vector of an Exec line: shlex tokens with field codes (%U, %f, ...) removed, %% unescaped and
+    leading `env` / VAR=value words skipped."""
+    if '"' in exec_cmd or "'" in exec_cmd or '\\' in exec_cmd:
+        try: argv = shlex.split(exec_cmd)
+        except ValueError: argv = exec_cmd.split()
+    else:
+        argv = exec_cmd.split()  # what shlex would return, without its per-character tokenizer
+    argv = [_FIELD_CODE_RE.sub(lambda m: '' if m.group(1) in FIELD_CODES else m.group(1) if m.group(1) == '%' else m.group(0), t)
+            for t in argv]
+    argv = [t for t in argv if t]
+    while argv and (os.path.basename(argv[0]) == 'env' or re.match(r'[A-Za-z_][A-Za-z0-9_]*=', argv[0])):
+        argv.pop(0)
+    return argv
+
+def canonical_exec(exec_cmd: str, resolved: Optional[dict] = None) -> tuple[str, ...]:
+    """What an Exec line really runs: shlex tokens without field codes (%U, %f, ...) or env prefixes, the
+    program looked up in PATH and every path argument reduced to its real path. So `python3 '/opt/x.py' %U`,
+    `/usr/bin/python3 /opt/x.py` and a symlink to /opt/x.py all give the same tuple.
+
+    The program keeps the name it is invoked as: binaries that act on argv[0] (snap wrappers in /snap/bin,
+    busybox applets, `view` -> vim) are only merged with commands that start them under the same name.
+
+    resolved memoizes PATH lookups and realpath() calls across many entries (pass one dict per report).
+    """
+    argv = exec_argv(exec_cmd)
+    if not argv: return ()
+    resolved = {} if resolved is None else resolved
+    def located(p):  # PATH lookup only
+        r = resolved.get(('which', p))
+        if r is None:
+            r = p
+            if '/' not in r:
+                import shutil
+                r = shutil.which(r) or r
+            resolved[('which', p)] = r
+        return r
+    def real(p):
+        r = resolved.get(p)
+        if r is None:
+            r = located(p)
+            if '/' in r: r = os.path.realpath(r)
+            resolved[p] = r
+        return r
+    def program(p):
+        r, where = real(p), located(p)
+        if '/' not in where or os.path.basename(r) == os.path.basename(where): return r
+        # A link under another name: resolve its dir (/bin -> /usr/bin), not the link itself
+        return os.path.join(real(os.path.dirname(where)), os.path.basename(where))
+    return (program(argv[0]),) + tuple(real(t) if '/' in t and not t.startswith('-') and '://' not in t else t for t in argv[1:])
+
+def find_duplicates(records) -> list[list[OverlayRecord]]:
+    """Group launchers that run the same command (see canonical_exec), in one pass over records.
+
+    Hidden/NoDisplay entries are left out: they are not in the app drawer. Each group is ordered so the entry
+    worth keeping comes first: visible system/Flatpak apps before local custom launchers, then by name.
+    """
+    resolved: dict = {}
+    groups: dict[tuple, list[OverlayRecord]] = {}
+    for rec in records:
+        e = rec.entry
+        if e is None or e.is_hidden() or e.data.get('Type', 'Application') != 'Application' or not e.data.get('Exec'):
+            continue
+        key = canonical_exec(e.data['Exec'], resolved)
+        if key: groups.setdefault(key, []).append(rec)
+    found = [g for g in groups.values() if len(g) > 1]
+    for g in found:
+        g.sort(key=lambda r: (r.entry.is_custom() and r.entry.is_local(), r.entry.display_name().lower(), r.desktop_id))
+    found.sort(key=lambda g: g[0].entry.display_name().lower())
+    return found
+
+class DuplicateLauncherError(Exception):
+    """An equivalent launcher already exists. kind is 'custom' (same Exec), 'system' (same Exec) or 'name'."""
+    def __init__(self, message: str, entry: DesktopEntry, kind: str):
+        super().__init__(message)
+        self.entry = entry
+        self.kind = kind
+
+def sanitize_name(name: str) -> str:
+    return ''.join(c for c in name if c.isalnum() or c in ('-','_')) or 'custom'
+
+def shebang_interpreter(head: bytes) -> Optional[str]:
+    """Program name of a '#!' line ('python3.12' for '#!/usr/bin/env -S python3.12 -u'), None without one."""
+    if not head.startswith(b'#!'): return None
+    tokens = head[2:].split(b'\n', 1)[0].decode('utf-8', 'replace').split()
+    if tokens and os.path.basename(tokens[0]) == 'env':
+        tokens = [t for t in tokens[1:] if not t.startswith('-') and '=' not in t]
+    return os.path.basename(tokens[0]) if tokens else None
+
+def sniff_file(path: str) -> Optional[tuple[str, str]]:
+    """(kind, wrapper) of a launchable file judged by its first bytes, falling back to the extension; None if
+    it does not look launchable.
+
+    kind is 'appimage', 'elf' or 'script'. wrapper is what 'Auto' runs it with: 'Direct' for binaries and for
+    shebangs that name no script interpreter, else the interpreter itself (versioned names like python3.12 kept).
+    """
+    try:
+        with open(path, 'rb') as f: head = f.read(SNIFF_BYTES)
+    except OSError:
+        head = b''
+    if head.startswith(b'\x7fELF'):
+        return ('appimage' if head[8:11] in (b'AI\x01', b'AI\x02') else 'elf'), 'Direct'
+    interpreter = shebang_interpreter(head)
+    if interpreter:
+        return 'script', interpreter if INTERPRETER_RE.match(interpreter) else 'Direct'
+    wrapper = SCRIPT_WRAPPERS.get(pathlib.Path(path).suffix.lower())
+    return ('script', wrapper) if wrapper else None
+
+def auto_wrapper(path: str) -> str:
+    """Wrapper that 'Auto' resolves to for a file: its shebang interpreter, else judged by its extension."""
+    sniffed = sniff_file(path)
+    return sniffed[1] if sniffed else 'Direct'
+
+def build_exec_command(path: str, wrapper: str = 'Auto', raw_args: str = '') -> str:
+    if not path:
+        return ''
+    raw_args = raw_args.strip()
+    try:
+        arg_tokens = shlex.split(raw_args) if raw_args else []
+    except ValueError:
+        # fallback treat as single arg string
+        arg_tokens = [raw_args] if raw_args else []
+    if wrapper == 'Auto':
+        wrapper = auto_wrapper(path)
+    parts = [path] if wrapper == 'Direct' else [wrapper, path]
+    parts.extend(arg_tokens)
+    return ' '.join(shlex.quote(p) for p in parts)
+
+def make_executable(path: str):
+    st = os.stat(path); os.chmod(path, st.st_mode | 0o111)
+
+def atomic_write(path: pathlib.Path, data, mode: int = 0o644):
+    """Write data via a synced temp file in the same dir and a rename: readers see the old or the new file, never a partial one."""
+    import tempfile
+    if isinstance(data, str): data = data.encode('utf-8')
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f'.{path.name}.', suffix='.tmp', dir=path.parent)  # hidden, not *.desktop
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data); f.flush()
+            os.fchmod(f.fileno(), mode)
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try: os.unlink(tmp)
+        except OSError: pass
+        raise
+
+_transaction = threading.local()
+
+class Transaction:
+    """Group launcher file changes into one unit.
+
+    Each write is atomic and visible right away (later steps of the same batch can read it). If the block
+    raises, every file it touched is restored to its previous content. On success the desktop database (and
+    the icon store, for stored icons) is marked for one deferred refresh, however many files changed. Nested transactions join the outer one as a
+    savepoint: if the inner block raises, its own changes are undone even when the outer block catches the
+    error and goes on. Writes outside any transaction get a transaction of their own.
+
+        with Transaction():
+            for entry in entries: hide_entry(entry)
+    """
+    def __init__(self):
+        self.undo: list[tuple[pathlib.Path, Optional[bytes]]] = []  # (path, previous bytes or None if it was new)
+        self.touched: dict[pathlib.Path, int] = {}  # path -> index of its latest undo entry
+        self.savepoints: list[int] = []  # undo journal length at entry of each open nested block
+        self.joined = False
+
+    @staticmethod
+    def current() -> Optional['Transaction']:
+        return getattr(_transaction, 'active', None)
+
+    def __enter__(self) -> 'Transaction':
+        outer = Transaction.current()
+        if outer is not None:
+            self.joined = True; self.outer = outer
+            outer.savepoints.append(len(outer.undo))
+            return outer
+        _transaction.active = self
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.joined:
+            savepoint = self.outer.savepoints.pop()
+            if exc_type is not None: self.outer.rollback(savepoint)
+            return False
+        _transaction.active = None
+        if exc_type is not None:
+            self.rollback()
+            return False
+        if any(p.parent == LOCAL_APPS for p in self.touched):
+            DESKTOP_DB.dirty = True
+        if any(p.name.startswith(ICON_PREFIX) and ICON_STORE.root in p.parents for p in self.touched):
+            ICON_STORE.dirty = True
+        return False
+
+    def _remember(self, path: pathlib.Path):
+        # Journal a path once per savepoint, so an inner block can undo what it wrote over the outer one
+        if self.touched.get(path, -1) >= (self.savepoints[-1] if self.savepoints else 0): return
+        self.touched[path] = len(self.undo)
+        try: self.undo.append((path, path.read_bytes()))
+        except FileNotFoundError: self.undo.append((path, None))
+
+    def write(self, path: pathlib.Path, data, mode: int = 0o644):
+        self._remember(path)
+        atomic_write(path, data, mode)
+
+    def remove(self, path: pathlib.Path):
+        self._remember(path)
+        path.unlink()
+
+    def rollback(self, savepoint: int = 0):
+        """Restore the files changed since the journal had `savepoint` entries (all of them by default)."""
+        undone = self.undo[savepoint:]
+        for path, previous in reversed(undone):
+            try:
+                if previous is None: path.unlink(missing_ok=True)
+                else: atomic_write(path, previous)
+            except OSError as e:
+                print('Rollback error', e)
+        del self.undo[savepoint:]
+        self.touched = {path: i for i, (path, _) in enumerate(self.undo)}
+
+def write_file(path: pathlib.Path, data, mode: int = 0o644):
+    """Atomically write a launcher file as part of the current transaction (or a one-file transaction)."""
+    with Transaction() as txn:
+        txn.write(path, data, mode)
+
+def remove_file(path: pathlib.Path):
+    with Transaction() as txn:
+        txn.remove(path)
+
+class DesktopDatabase:
+    """Deferred refresh of LOCAL_APPS after committed transactions: update-desktop-database (MIME cache) and
+    a dir mtime bump, run once by flush() for any number of changes."""
+    def __init__(self, apps_dir: pathlib.Path = LOCAL_APPS):
+        self.apps_dir = apps_dir
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    def flush(self) -> bool:
+        with self.lock:
+            if not self.dirty: return False
+            self.dirty = False
+        if not self.apps_dir.is_dir(): return False
+        run_tool(['update-desktop-database', '-q', str(self.apps_dir)])
+        try: os.utime(self.apps_dir)
+        except OSError: pass
+        return True
+
+DESKTOP_DB = DesktopDatabase()
+
+def run_tool(argv: list[str], timeout: float = 30) -> bool:
+    """Run a helper program quietly if it is installed. Returns False if it is missing or could not run."""
+    import shutil, subprocess
+    if not shutil.which(argv[0]): return False
+    try:
+        subprocess.run(argv, check=False, timeout=timeout, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return True
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f'{argv[0]} error', e)
+        return False
+
+def flush_pending() -> dict:
+    """Run the batched follow-up work of everything changed so far: icon GC + icon cache, desktop database."""
+    return {'icons': ICON_STORE.flush(), 'desktop_database': DESKTOP_DB.flush()}
+
+def _png_size(data: bytes) -> int:
+    """Larger side of a PNG from its IHDR chunk (0 if data is not a PNG)."""
+    if data[:8] != b'\x89PNG\r\n\x1a\n' or len(data) < 24: return 0
+    return max(int.from_bytes(data[16:20], 'big'), int.from_bytes(data[20:24], 'big'))
+
+def _pixbuf_module():
+    # Optional: GdkPixbuf scales raster icons to every standard size; without it the source is stored as is
+    try:
+        import gi
+        gi.require_version('GdkPixbuf', '2.0')
+        from gi.repository import GdkPixbuf
+        return GdkPixbuf
+    except (ImportError, ValueError):
+        return None
+
+class IconStore:
+    """Content-addressed icons in the local hicolor theme.
+
+    An image is stored once as adm-<hash> in every standard size it can fill (48, 64, 128, 256, or scalable
+    for SVG) and launchers refer to it by that theme name, so launchers sharing an image share the files and
+    re-saving writes nothing. Files are written through the current transaction, so a rolled-back batch leaves
+    no stored icon behind. Changes are batched: flush() collects unused adm-* icons and refreshes the icon
+    cache once for everything stored (on commit) or released since the last flush.
+    """
+    def __init__(self, root: pathlib.Path = ICON_THEME_DIR):
+        self.root = root
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    def files(self, name: str) -> list[pathlib.Path]:
+        """Every stored file of an icon name, across all size dirs."""
+        found = []
+        for size_dir in ICON_SIZE_DIRS:
+            d = self.root / size_dir / 'apps'
+            for ext in ('.png', '.svg', '.xpm'):
+                if (d / f'{name}{ext}').is_file(): found.append(d / f'{name}{ext}')
+        return found
+
+    def store(self, icon: str) -> str:
+        """Store an icon file; returns the Icon= value. Names and unreadable files are returned unchanged."""
+        if not icon or not os.path.isfile(icon):
+            return icon
+        try:
+            data = pathlib.Path(icon).read_bytes()
+        except OSError:
+            return icon
+        return self.store_bytes(data, pathlib.Path(icon).suffix.lower()) or icon
+
+    @staticmethod
+    def name_for(data: bytes) -> str:
+        """Icon name the store gives this image data (stored or not)."""
+        import hashlib
+        return ICON_PREFIX + hashlib.sha256(data).hexdigest()[:20]
+
+    def store_bytes(self, data: bytes, suffix: str) -> Optional[str]:
+        """Store image data; returns the Icon= value, or None if it could not be stored."""
+        name = self.name_for(data)
+        if self.files(name):
+            return name
+        try:
+            with Transaction():  # all sizes or none
+                written = self._write(name, data, suffix)
+        except Exception as e:
+            print('Icon store error', e)
+            return None
+        if not written:
+            # Not a theme format and nothing to convert it with: keep an absolute path to a stored copy
+            target = ICON_DIR / f'{name}{suffix or ".png"}'
+            if not target.exists(): write_file(target, data)
+            return str(target)
+        return name
+
+    def _write(self, name: str, data: bytes, suffix: str) -> bool:
+        if suffix in ('.svg', '.svgz'):
+            self._put('scalable', f'{name}.svg', data)
+            return True
+        GdkPixbuf = _pixbuf_module()
+        if GdkPixbuf is not None:
+            loader = GdkPixbuf.PixbufLoader(); loader.write(data); loader.close()
+            pixbuf = loader.get_pixbuf()
+            src = max(pixbuf.get_width(), pixbuf.get_height())
+            sizes = [n for n in ICON_SIZES if n <= src] or [ICON_SIZES[0]]  # never upscale past the first size
+            for n in sizes:
+                w, h = pixbuf.get_width(), pixbuf.get_height()
+                scaled = pixbuf.scale_simple(max(1, w * n // src), max(1, h * n // src), GdkPixbuf.InterpType.HYPER)
+                ok, buf = scaled.save_to_bufferv('png', [], [])
+                if ok: self._put(f'{n}x{n}', f'{name}.png', bytes(buf))
+            return True
+        if suffix not in ('.png', '.xpm'):
+            return False
+        src = _png_size(data) or 128
+        size = min(ICON_SIZES, key=lambda n: abs(n - src))
+        self._put(f'{size}x{size}', f'{name}{suffix}', data)
+        return True
+
+    def _put(self, size_dir: str, filename: str, data: bytes):
+        write_file(self.root / size_dir / 'apps' / filename, data)
+
+    def release(self):
+        """Note that an icon may have lost its last user; it is collected on the next flush()."""
+        self.dirty = True
+
+    def collect(self, used: set[str]) -> list[pathlib.Path]:
+        """Delete adm-* icons (in any size) whose name is not in used. Returns the removed files."""
+        removed = []
+        for size_dir in ICON_SIZE_DIRS:
+            d = self.root / size_dir / 'apps'
+            try: names = os.listdir(d)
+            except OSError: continue
+            for fn in names:
+                if fn.startswith(ICON_PREFIX) and fn.rsplit('.', 1)[0] not in used and str(d / fn) not in used:
+                    try: (d / fn).unlink(); removed.append(d / fn)
+                    except OSError: pass
+        return removed
+
+    def used_names(self) -> set[str]:
+        """Icon= values of all local launchers (from the entry cache, so this rarely parses anything)."""
+        return {e.icon_name() for e in ENTRY_CACHE.scan(LOCAL_APPS) if e.icon_name()}
+
+    def flush(self) -> dict:
+        """Collect unused icons and refresh the icon cache, once for all changes since the last flush."""
+        with self.lock:
+            if not self.dirty: return {'removed': 0, 'cache_updated': False}
+            self.dirty = False
+        removed = self.collect(self.used_names())
+        return {'removed': len(removed), 'cache_updated': self.update_icon_cache()}
+
+    def update_icon_cache(self) -> bool:
+        """Rebuild the theme's icon cache if the tool exists (a stale cache hides new icons); else bump the dir mtime."""
+        if not self.root.is_dir(): return False
+        for tool in ('gtk4-update-icon-cache', 'gtk-update-icon-cache'):
+            if run_tool([tool, '-q', '-t', '-f', str(self.root)]):
+                return True
+        try: os.utime(self.root)
+        except OSError: pass
+        return False
+
+ICON_STORE = IconStore()
+
+def _mtime(path: str) -> Optional[int]:
+    try: return os.stat(path).st_mtime_ns
+    except OSError: return None
+
+class _HealthRun:
+    """Per-check memo shared by the worker threads: PATH lookups, stat() results and an index of installed icons.
+
+    Every lookup also returns the paths whose mtimes decide it: the file that was found, or for a miss the
+    directories that were searched (installing a program or an icon theme's cache changes their mtime).
+    """
+    def __init__(self):
+        self.programs: dict[str, tuple] = {}
+        self.mtimes: dict[str, Optional[int]] = {}
+        self.icons: Optional[dict[str, str]] = None
+        self.icon_dirs: list[str] = []
+        self.lock = threading.Lock()
+
+    def mtime(self, path: str) -> Optional[int]:
+        if path not in self.mtimes: self.mtimes[path] = _mtime(path)
+        return self.mtimes[path]
+
+    def program(self, name: str) -> tuple[Optional[str], list[str]]:
+        if name not in self.programs:
+            if '/' in name:
+                name = os.path.expanduser(name)
+                self.programs[name] = (name if os.path.isfile(name) else None), [name]
+            else:
+                import shutil
+                found = shutil.which(name)
+                self.programs[name] = found, ([found] if found else os.environ.get('PATH', os.defpath).split(os.pathsep))
+        return self.programs[name]
+
+    def icon(self, name: str) -> tuple[Optional[str], list[str]]:
+        if os.path.isabs(name):
+            return (name if os.path.isfile(name) else None), [name]
+        with self.lock:
+            if self.icons is None: self._index_icons()
+        found = self.icons.get(name.rsplit('.', 1)[0] if name.endswith(('.png', '.svg', '.xpm')) else name)
+        return found, ([found] if found else self.icon_dirs)
+
+    def _index_icons(self):
+        # Every icon file of every theme (and pixmaps) in the XDG data dirs: name -> first file found
+        index: dict[str, str] = {}
+        bases = [str(pathlib.Path.home() / '.icons')] + [str(d.parent / sub) for sub in ('icons', 'pixmaps') for d in SYSTEM_APP_DIRS]
+        for base in bases:
+            for root, dirs, files in os.walk(base):
+                if root == base or os.path.dirname(root) == base: self.icon_dirs.append(root)  # base and theme dirs
+                for fn in files:
+                    stem, dot, ext = fn.rpartition('.')
+                    if dot and ext in ('png', 'svg', 'xpm') and stem not in index:
+                        index[stem] = os.path.join(root, fn)
+        self.icon_dirs += [b for b in bases if b not in self.icon_dirs]  # so that creating one is noticed
+        self.icons = index
+
+def check_entry(entry: DesktopEntry, run: Optional[_HealthRun] = None) -> tuple[list[str], list[list]]:
+    """Problems that keep a launcher from starting or showing its icon, plus the paths the result depends on
+    (as [path, mtime_ns]; it stays valid while their mtimes are unchanged)."""
+    run = run or _HealthRun()
+    problems: list[str] = []; deps: list[str] = []
+    try_exec = entry.data.get('TryExec')
+    if try_exec:
+        found, used = run.program(try_exec); deps += used
+        if found is None: problems.append(f'TryExec not found: {try_exec}')
+    argv = exec_argv(entry.data.get('Exec', ''))
+    if not argv:
+        problems.append('No Exec command')
+    else:
+        prog, used = run.program(argv[0]); deps += used
+        if prog is None:
+            problems.append(f'Program not found: {argv[0]}')
+        elif not os.access(prog, os.X_OK):
+            problems.append(f'Not executable: {prog}')
+        elif INTERPRETER_RE.match(os.path.basename(prog)):
+            # The script after a wrapper (python3 /x/y.py, bash ~/s.sh); -c/-m take code or a module instead
+            i = next((i for i, a in enumerate(argv[1:], 1) if not a.startswith('-')), None)
+            if i is not None and '/' in argv[i] and not any(a in ('-c', '-m') for a in argv[1:i]):
+                script = os.path.expanduser(argv[i]); deps.append(script)
+                if not os.path.exists(script): problems.append(f'Script not found: {script}')
+    icon = entry.icon_name()
+    if icon:
+        found, used = run.icon(icon); deps += used
+        if found is None: problems.append(f'Icon not found: {icon}')
+    return problems, [[p, run.mtime(p)] for p in dict.fromkeys(deps)]
+
+class HealthChecker:
+    """Launcher health checks on a thread pool, cached per .desktop file.
+
+    A cached result is reused while the .desktop file and every path it depends on (the program, script and icon
+    found, or the dirs searched for a missing one) keep their mtimes, so a re-check is mostly stat() calls.
+    """
+    def __init__(self, path: pathlib.Path = HEALTH_CACHE_FILE):
+        self.path = path
+        self.results: dict[str, list] = {}  # .desktop path -> [mtime_ns, size, problems, [[dep, mtime_ns], ...]]
+        self.dirty = False
+        self.lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            raw = json.loads(self.path.read_text(encoding='utf-8'))
+            if raw.get('version') == HEALTH_CACHE_VERSION:
+                self.results = raw.get('results', {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print('Health cache load error', e)
+
+    def save(self):
+        with self.lock:
+            if not self.dirty: return
+            payload = json.dumps({'version': HEALTH_CACHE_VERSION, 'results': self.results}, separators=(',', ':'))
+            self.dirty = False
+        try:
+            atomic_write(self.path, payload)
+        except Exception as e:
+            print('Health cache save error', e)
+
+    def check(self, records, cancel: Optional[threading.Event] = None, workers: int = HEALTH_WORKERS) -> dict[str, list[str]]:
+        """Problems per desktop ID; only broken entries are in the result.
+
+        Cached results are validated inline (memoized stat() calls); only the entries that need a real check
+        go to the thread pool.
+        """
+        run = _HealthRun()
+        result: dict[str, list[str]] = {}; todo = []
+        for rec in records:
+            if rec.entry is None: continue
+            try:
+                st = os.stat(rec.path)
+            except OSError:
+                result[rec.desktop_id] = ['Launcher file is gone']; continue
+            cached = self.results.get(str(rec.path))
+            if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size and all(run.mtime(p) == m for p, m in cached[3]):
+                PROFILE.count('health_cache_hits')
+                if cached[2]: result[rec.desktop_id] = cached[2]
+            else:
+                todo.append((rec, st))
+        if todo:
+            # A few chunks per worker: one future per entry would cost more than most checks
+            from concurrent.futures import ThreadPoolExecutor
+            step = -(-len(todo) // (workers * 4))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='health') as pool:
+                for chunk in pool.map(lambda i: self._check_chunk(todo[i:i + step], run, cancel), range(0, len(todo), step)):
+                    result.update(chunk)
+        return result
+
+    def _check_chunk(self, todo: list, run: _HealthRun, cancel: Optional[threading.Event]) -> dict[str, list[str]]:
+        found = {}; fresh = {}
+        for rec, st in todo:
+            if cancel is not None and cancel.is_set(): break
+            problems, deps = check_entry(rec.entry, run)
+            fresh[str(rec.path)] = [st.st_mtime_ns, st.st_size, problems, deps]
+            if problems: found[rec.desktop_id] = problems
+        PROFILE.count('health_checked', len(fresh))
+        with self.lock:
+            self.results.update(fresh); self.dirty = self.dirty or bool(fresh)
+        return found
+
+HEALTH = HealthChecker()
+
+def process_children() -> dict[int, list[int]]:
+    """Parent PID -> child PIDs of every live process (one pass over /proc)."""
+    children: dict[int, list[int]] = {}
+    for name in os.listdir('/proc'):
+        if not name.isdigit(): continue
+        try:
+            with open(f'/proc/{name}/stat', 'rb') as f: stat = f.read()
+        except OSError:
+            continue
+        ppid = int(stat[stat.rindex(b')') + 2:].split(None, 2)[1])  # comm may contain spaces and parentheses
+        children.setdefault(ppid, []).append(int(name))
+    return children
+
+def process_tree(pid: int, children: Optional[dict[int, list[int]]] = None) -> set[int]:
+    """pid and all its live descendants (wrappers like python3 or AppRun fork the real program). Pass a
+    process_children() map to reuse one /proc pass for several lookups."""
+    if children is None: children = process_children()
+    tree = {pid}; todo = [pid]
+    while todo:
+        for child in children.get(todo.pop(), ()):
+            if child not in tree: tree.add(child); todo.append(child)
+    return tree
+
+def window_pids() -> Optional[set[int]]:
+    """PIDs owning a mapped top-level window (EWMH _NET_WM_PID via wmctrl), or None if that cannot be probed.
+
+    Only X11 clients are visible to other programs. A Wayland session sets DISPLAY too (for XWayland), but
+    its native windows never show up, so there is nothing to probe there.
+    """
+    import shutil, subprocess
+    if os.environ.get('WAYLAND_DISPLAY') or os.environ.get('XDG_SESSION_TYPE') == 'wayland': return None
+    if not os.environ.get('DISPLAY') or not shutil.which('wmctrl'): return None
+    try:
+        out = subprocess.run(['wmctrl', '-lp'], capture_output=True, text=True, timeout=2).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    pids = set()
+    for line in out.splitlines():
+        parts = line.split(None, 3)
+        if len(parts) > 2 and parts[2].isdigit(): pids.add(int(parts[2]))
+    return pids
+
+class LaunchHistory:
+    """Startup latencies per desktop ID, newest last: [unix time, ms, outcome, Exec at the time].
+
+    outcome is 'window' (spawn to first mapped window) or 'exit' (spawn to process exit: terminal apps, and
+    programs that hand off to an already running instance). Keeping the Exec line shows whether a wrapper
+    change (python3 -> Direct, an AppImage extracted, ...) made a launcher faster.
+    """
+    def __init__(self, path: pathlib.Path = LAUNCH_HISTORY_FILE):
+        self.path = path
+        self.runs: Optional[dict[str, list]] = None  # read on first use
+        self.lock = threading.Lock()
+
+    def _load(self) -> dict[str, list]:
+        if self.runs is None:
+            try:
+                self.runs = json.loads(self.path.read_text(encoding='utf-8'))
+            except FileNotFoundError:
+                self.runs = {}
+            except Exception as e:
+                print('Launch history load error', e); self.runs = {}
+        return self.runs
+
+    def record(self, desktop_id: str, ms: float, outcome: str, exec_cmd: str):
+        with self.lock:
+            runs = self._load().setdefault(desktop_id, [])
+            runs.append([int(time.time()), round(ms, 1), outcome, exec_cmd])
+            del runs[:-LAUNCH_HISTORY_SIZE]
+            payload = json.dumps(self.runs, separators=(',', ':'))
+        try:
+            atomic_write(self.path, payload)
+        except Exception as e:
+            print('Launch history save error', e)
+
+    def history(self, desktop_id: str) -> list:
+        with self.lock:
+            return list(self._load().get(desktop_id, ()))
+
+    def summary(self, desktop_id: str) -> Optional[dict]:
+        """Last and median latency plus the median per Exec line, or None if the launcher was never timed."""
+        import statistics
+        runs = self.history(desktop_id)
+        if not runs: return None
+        by_exec: dict[str, list[float]] = {}
+        for _t, ms, _outcome, exec_cmd in runs: by_exec.setdefault(exec_cmd, []).append(ms)
+        return {'runs': len(runs), 'last_ms': runs[-1][1], 'last_outcome': runs[-1][2],
+                'median_ms': statistics.median(r[1] for r in runs),
+                'by_exec': {e: {'runs': len(v), 'median_ms': statistics.median(v)} for e, v in by_exec.items()}}
+
+    def ids(self) -> list[str]:
+        with self.lock:
+            return sorted(self._load())
+
+LAUNCHES = LaunchHistory()
+
+def launcher_lines(name: str, exec_cmd: str, comment: str = '', icon: str = '', categories: str = '', terminal: bool = False) -> list[str]:
+    lines = ['[Desktop Entry]', f'Name={name}', 'Type=Application', f'Exec={exec_cmd}', f'Terminal={"true" if terminal else "false"}']
+    if comment: lines.append(f'Comment={comment}')
+    if icon: lines.append(f'Icon={icon}')
+    if categories:
+        if not categories.endswith(';'): categories += ';'
+        lines.append(f'Categories={categories}')
+    return lines
+
+def _unique_local_path(stem: str) -> pathlib.Path:
+    path = LOCAL_APPS / f'{stem}.desktop'; counter = 1
+    while path.exists():
+        path = LOCAL_APPS / f'{stem}-{counter}.desktop'; counter += 1
+    return path
+
+def _with_marker(doc: DesktopFile) -> DesktopFile:
+    if doc.get(CUSTOM_MARKER_KEY) is None:
+        doc.set(CUSTOM_MARKER_KEY, CUSTOM_MARKER_VALUE)
+    return doc
+
+def create_launcher(index: LauncherIndex, name: str, exec_cmd: str, comment: str = '', icon: str = '',
+                    categories: str = '', terminal: bool = False) -> pathlib.Path:
+    """Write a new custom launcher to LOCAL_APPS. Raises DuplicateLauncherError instead of creating a duplicate."""
+    existing = index.find_custom_by_exec(exec_cmd)
+    if existing:
+        raise DuplicateLauncherError('Already exists', existing, 'custom')
+    existing = index.find_system_by_exec(exec_cmd)
+    if existing:
+        raise DuplicateLauncherError('System app already runs this', existing, 'system')
+    # Also prevent duplicate name file (same sanitized base)
+    fname = sanitize_name(name)
+    possible = LOCAL_APPS / f'{fname}.desktop'
+    if possible.exists():
+        existing = DesktopEntry(possible)
+        if existing.is_custom():
+            raise DuplicateLauncherError('Name already used', existing, 'name')
+    desktop_path = _unique_local_path(fname)
+    lines = launcher_lines(name, exec_cmd, comment, ICON_STORE.store(icon), categories, terminal)
+    lines.append(f'{CUSTOM_MARKER_KEY}={CUSTOM_MARKER_VALUE}')
+    write_file(desktop_path, '\n'.join(lines)+'\n')
+    index.refresh(desktop_path.name)
+    return desktop_path
+
+def walk_dropped(paths, limit: int = DROP_MAX_FILES) -> list[str]:
+    """Files under the given files and dirs, in order; hidden and DROP_SKIP_DIRS dirs and .desktop files skipped."""
+    files = []
+    for p in paths:
+        p = os.path.abspath(os.path.expanduser(p))
+        if os.path.isfile(p): files.append(p)
+        for root, dirs, names in os.walk(p) if os.path.isdir(p) else ():
+            dirs[:] = sorted(d for d in dirs if not d.startswith('.') and d not in DROP_SKIP_DIRS)
+            files.extend(os.path.join(root, n) for n in sorted(names) if not n.startswith('.') and not n.endswith('.desktop'))
+            if len(files) >= limit: return files[:limit]
+    return files[:limit]
+
+def launch_candidate(path: str) -> Optional[dict]:
+    """Proposed launcher for one file, or None. Only executables, known script extensions, extension-less files
+    and AppImages are opened, and of those only the first SNIFF_BYTES are read."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    name = os.path.basename(path); suffix = os.path.splitext(name)[1].lower()
+    executable = bool(st.st_mode & 0o111)
+    if not stat.S_ISREG(st.st_mode) or not (executable or suffix in SCRIPT_WRAPPERS or suffix in ('', '.appimage')):
+        return None
+    sniffed = sniff_file(path)
+    if sniffed is None: return None
+    kind, wrapper = sniffed
+    if kind == 'elf' and (not executable or _SHARED_LIB_RE.search(name)): return None  # objects and libraries
+    return {'path': path, 'kind': kind, 'wrapper': wrapper, 'name': pathlib.Path(path).stem.replace('_',' ').title(),
+            'exec': build_exec_command(path, wrapper), 'chmod': wrapper == 'Direct' and not executable}
+
+def detect_launchables(paths, cancel: Optional[threading.Event] = None, workers: int = HEALTH_WORKERS) -> list[dict]:
+    """Walk dropped files and dirs and sniff every file on a thread pool; candidates in walk order."""
+    files = walk_dropped(paths)
+    if not files: return []
+    def sniff_chunk(chunk: list[str]) -> list[dict]:
+        found = []
+        for path in chunk:
+            if cancel is not None and cancel.is_set(): break
+            candidate = launch_candidate(path)
+            if candidate is not None: found.append(candidate)
+        return found
+    from concurrent.futures import ThreadPoolExecutor
+    step = -(-len(files) // (workers * 4))  # a few chunks per worker, as in HealthChecker.check
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sniff') as pool:
+        return [c for chunk in pool.map(sniff_chunk, (files[i:i + step] for i in range(0, len(files), step))) for c in chunk]
+
+def plan_batch(index: LauncherIndex, candidates: list[dict]) -> list[dict]:
+    """Mark candidates whose Exec an existing launcher (or an earlier candidate) already runs: 'skip' is the reason or None."""
+    seen_exec: set[str] = set()
+    for c in candidates:
+        key = normalize_exec(c['exec'])
+        existing = index.find_custom_by_exec(c['exec']) or index.find_system_by_exec(c['exec'])
+        if existing is not None: c['skip'] = f'already launched by {existing.path.name}'
+        elif key in seen_exec: c['skip'] = 'duplicate in this batch'
+        else: c['skip'] = None; seen_exec.add(key)
+    return candidates
+
+def create_launchers(index: LauncherIndex, candidates: list[dict]) -> list[str]:
+    """Write a launcher for every candidate not marked to skip, in one transaction (one desktop-database
+    refresh); returns the new desktop IDs. Run plan_batch first."""
+    created = []
+    with Transaction():
+        for c in candidates:
+            if c.get('skip'): continue
+            path = _unique_local_path(sanitize_name(c['name']))  # earlier files of the batch are on disk already
+            lines = launcher_lines(c['name'], c['exec'], terminal=c.get('terminal', False))
+            lines.append(f'{CUSTOM_MARKER_KEY}={CUSTOM_MARKER_VALUE}')
+            write_file(path, '\n'.join(lines)+'\n'); created.append(path.name)
+    for c in candidates:
+        if c['chmod'] and not c.get('skip'):
+            try: make_executable(c['path'])
+            except OSError as e: print('chmod error', c['path'], e)
+    for desktop_id in created:
+        index.refresh(desktop_id)
+    return created
+
+def save_launcher(path: pathlib.Path, data: dict, name: str, exec_cmd: str, comment: str = '', icon: str = '',
+                  categories: str = '', terminal: bool = False):
+    """Apply the edit form fields to an existing local launcher.
+
+    The file is fully parsed here, so actions, translations and keys the form does not show are kept.
+    Emptied optional fields are removed.
+    """
+    try:
+        doc = DesktopFile.load(path)
+    except FileNotFoundError:
+        doc = DesktopFile()
+    _apply_fields(doc, name, exec_cmd, comment, icon, categories, terminal)
+    if data.get(OVERRIDE_MARKER_KEY) and doc.get(OVERRIDE_MARKER_KEY) is None:
+        doc.set(OVERRIDE_MARKER_KEY, data[OVERRIDE_MARKER_KEY])
+    doc.save(path)
+
+def _apply_fields(doc: DesktopFile, name: str, exec_cmd: str, comment: str, icon: str, categories: str, terminal: bool):
+    """Set the launcher form fields (and the custom marker) on doc; an icon file is stored first."""
+    old_icon = doc.get('Icon')
+    icon = ICON_STORE.store(icon)
+    if categories and not categories.endswith(';'): categories += ';'
+    doc.set('Name', name); doc.set('Type', doc.get('Type') or 'Application')
+    doc.set('Exec', exec_cmd); doc.set('Terminal', 'true' if terminal else 'false')
+    for key, value in (('Comment', comment), ('Icon', icon), ('Categories', categories)):
+        if value: doc.set(key, value)
+        else: doc.remove(key)
+    doc.set(CUSTOM_MARKER_KEY, CUSTOM_MARKER_VALUE)
+    if old_icon != icon: ICON_STORE.release()
+
+def clone_entry(entry: DesktopEntry) -> pathlib.Path:
+    doc = _with_marker(DesktopFile.load(entry.path))
+    target = _unique_local_path(pathlib.Path(entry.path.name).stem)
+    LOCAL_APPS.mkdir(parents=True, exist_ok=True)
+    doc.save(target)
+    return target
+
+def override_entry(entry: DesktopEntry) -> tuple[pathlib.Path, bool]:
+    """Create a local copy shadowing a system entry. Returns (path, created); an existing custom override is reused."""
+    doc = _with_marker(DesktopFile.load(entry.path))
+    doc.set(OVERRIDE_MARKER_KEY, '1')
+    target = LOCAL_APPS / entry.path.name
+    base = target.stem; counter = 1
+    while target.exists():
+        # If an existing override (already custom) then just reuse it
+        if DesktopEntry(target).is_custom():
+            return target, False
+        target = LOCAL_APPS / f"{base}-{counter}.desktop"; counter += 1
+    LOCAL_APPS.mkdir(parents=True, exist_ok=True)
+    doc.save(target)
+    return target, True
+
+def hide_entry(entry: DesktopEntry) -> pathlib.Path:
+    """Create a local override with Hidden=true (acts like delete)."""
+    doc = DesktopFile.load(entry.path)
+    if not doc.has_group():
+        raise ValueError('Invalid desktop file')
+    # An upstream Hidden/NoDisplay marker is kept; the local override is still created
+    _with_marker(doc).set(OVERRIDE_MARKER_KEY, '1')
+    if doc.get('Hidden') is None and doc.get('NoDisplay') is None:
+        doc.set('Hidden', 'true')
+    target = LOCAL_APPS / entry.path.name
+    base = target.stem; counter = 1
+    while target.exists() and not DesktopEntry(target).is_custom():
+        target = LOCAL_APPS / f"{base}-{counter}.desktop"; counter += 1
+    LOCAL_APPS.mkdir(parents=True, exist_ok=True)
+    doc.save(target)
+    return target
+
+def unhide_entry(entry: DesktopEntry) -> bool:
+    """Drop Hidden/NoDisplay from a local entry. Returns False if it was not hidden."""
+    doc = DesktopFile.load(entry.path)
+    removed = doc.remove('Hidden') | doc.remove('NoDisplay')  # only the main group; actions keep their keys
+    if not removed:
+        return False
+    doc.save(entry.path)
+    return True
+
+def retire_entry(entry: DesktopEntry) -> tuple[str, pathlib.Path]:
+    """Take a redundant launcher out of the app drawer: custom launchers are deleted, anything else is hidden
+    with a local override. Returns (action, path of the affected file)."""
+    if entry.is_custom() and entry.is_local() and entry.data.get(OVERRIDE_MARKER_KEY) != '1':
+        remove_entry(entry)
+        return 'deleted', entry.path
+    if entry.is_custom() and entry.is_local():
+        # An override: hide it in place instead of deleting it (which would bring the system entry back)
+        doc = DesktopFile.load(entry.path); doc.set('Hidden', 'true'); doc.save(entry.path)
+        return 'hidden', entry.path
+    return 'hidden', hide_entry(entry)
+
+def remove_entry(entry: DesktopEntry) -> bool:
+    """Delete a local .desktop file (delete for launchers, revert for overrides). Returns False if already gone."""
+    if not entry.is_local():
+        raise ValueError('Only local entries can be removed')
+    if not entry.path.exists():
+        return False
+    remove_file(entry.path)
+    if entry.icon_name(): ICON_STORE.release()
+    return True
+
+def import_desktop_file(path: pathlib.Path) -> pathlib.Path:
+    import datetime
+    doc = _with_marker(DesktopFile.load(path))
+    target = LOCAL_APPS / path.name
+    if target.exists():
+        target = LOCAL_APPS / f"imported-{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}-{path.name}"
+    LOCAL_APPS.mkdir(parents=True, exist_ok=True)
+    doc.save(target)
+    return target
+
+def export_archive(index: LauncherIndex, dest: pathlib.Path) -> dict:
+    """Write every custom local launcher plus the icons it keeps under ~/.local/share/icons into one tar.gz.
+
+    Stored (adm-*) icons are exported in every size; the manifest is the first member so imports can stream the archive.
+    """
+    import datetime, io, tarfile
+    icons_root = DATA_HOME / 'icons'
+    records = [r for r in index.search('', show_all=False)]
+    manifest = {'version': ARCHIVE_VERSION, 'created': datetime.datetime.now().isoformat(timespec='seconds'), 'entries': []}
+    payload: list[tuple[str, bytes]] = []
+    for rec in records:
+        item = {'id': rec.desktop_id, 'file': f'applications/{rec.desktop_id}', 'exec': rec.entry.data.get('Exec', '')}
+        icon = rec.entry.icon_name() or ''
+        if icon.startswith(ICON_PREFIX) and os.sep not in icon:
+            item['icon_files'] = []
+            for f in ICON_STORE.files(icon):
+                member = f'icons/{f.parent.parent.name}/{f.name}'
+                if all(name != member for name, _ in payload):
+                    payload.append((member, f.read_bytes()))
+                item['icon_files'].append(member)
+        elif icon.startswith(str(icons_root) + os.sep) and os.path.isfile(icon):
+            member = f'icons/{pathlib.Path(icon).name}'
+            if all(name != member for name, _ in payload):
+                payload.append((member, pathlib.Path(icon).read_bytes()))
+            item['icon'] = member
+        payload.append((item['file'], rec.path.read_bytes()))
+        manifest['entries'].append(item)
+    def add(tar, name, data):
+        info = tarfile.TarInfo(name); info.size = len(data); info.mtime = int(datetime.datetime.now().timestamp()); info.mode = 0o644
+        tar.addfile(info, io.BytesIO(data))
+    with tarfile.open(dest, 'w:gz') as tar:
+        add(tar, ARCHIVE_MANIFEST, json.dumps(manifest, indent=2).encode('utf-8'))
+        for name, data in payload:
+            add(tar, name, data)
+    return {'path': str(dest), 'entries': len(manifest['entries']), 'icons': sum(1 for n, _ in payload if n.startswith('icons/'))}
+
+def import_archive(index: LauncherIndex, src: pathlib.Path) -> dict:
+    """Stream an export archive, validate and de-duplicate every entry, then write all accepted files at once.
+
+    Entries whose desktop ID already exists locally, or whose Exec matches an existing launcher (or an earlier
+    entry of the same archive), are skipped. Nothing is written if the archive itself is unreadable.
+    """
+    import tarfile
+    manifest = None; by_file: dict[str, dict] = {}
+    icon_data: dict[str, bytes] = {}
+    staged: list[tuple[pathlib.Path, object]] = []  # (target, bytes | DesktopFile)
+    legacy_icons: dict[str, tuple[bytes, str]] = {}  # desktop ID -> (data, suffix) of pre-store archive icons
+    skipped: list[dict] = []
+    seen_exec: set[str] = set()
+    with tarfile.open(src, 'r|*') as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            data = tar.extractfile(member).read()
+            if manifest is None:
+                if member.name != ARCHIVE_MANIFEST:
+                    raise ValueError('Not a launcher archive (manifest missing)')
+                manifest = json.loads(data.decode('utf-8'))
+                if manifest.get('version') != ARCHIVE_VERSION:
+                    raise ValueError(f"Unsupported archive version {manifest.get('version')}")
+                by_file = {e['file']: e for e in manifest.get('entries', [])}
+                continue
+            if member.name.startswith('icons/'):
+                icon_data[member.name] = data; continue
+            item = by_file.get(member.name)
+            if item is None:
+                continue
+            desktop_id = pathlib.Path(item['id']).name  # never trust paths from the archive
+            try:
+                contents = data.decode('utf-8')
+            except UnicodeDecodeError:
+                skipped.append({'id': desktop_id, 'reason': 'not UTF-8'}); continue
+            entry = DesktopEntry(LOCAL_APPS / desktop_id, read_entry_header(contents.splitlines()))
+            if not desktop_id.endswith('.desktop') or not entry.data.get('Name') or not entry.data.get('Exec'):
+                skipped.append({'id': desktop_id, 'reason': 'invalid desktop entry'}); continue
+            exec_key = normalize_exec(entry.data['Exec'])
+            if (LOCAL_APPS / desktop_id).exists() or any(p.name == desktop_id for p, _ in staged):
+                skipped.append({'id': desktop_id, 'reason': 'desktop ID exists'}); continue
+            if exec_key in seen_exec or index.find_custom_by_exec(entry.data['Exec']) or index.find_system_by_exec(entry.data['Exec']):
+                skipped.append({'id': desktop_id, 'reason': 'duplicate Exec'}); continue
+            seen_exec.add(exec_key)
+            doc = _with_marker(DesktopFile(contents))
+            for member in item.get('icon_files', ()):
+                size_dir, _, filename = member[len('icons/'):].partition('/')
+                if member in icon_data and size_dir in ICON_SIZE_DIRS and filename.startswith(ICON_PREFIX) and '/' not in filename:
+                    staged.append((ICON_STORE.root / size_dir / 'apps' / filename, icon_data[member]))
+            if item.get('icon') in icon_data:
+                legacy_icons[desktop_id] = (icon_data[item['icon']], pathlib.Path(item['icon']).suffix.lower())
+            staged.append((LOCAL_APPS / desktop_id, doc))
+    if manifest is None:
+        raise ValueError('Not a launcher archive (manifest missing)')
+    # Single write phase: everything was validated above
+    imported = []
+    with Transaction() as txn:
+        for path, data in staged:
+            if isinstance(data, bytes):
+                # Stored icons are content-addressed: an existing file already has these bytes
+                if not path.exists(): txn.write(path, data)
+            else:
+                if path.name in legacy_icons:
+                    icon = ICON_STORE.store_bytes(*legacy_icons[path.name])
+                    if icon: data.set('Icon', icon)
+                data.save(path); imported.append(path.name)
+    for desktop_id in imported:
+        index.refresh(desktop_id)
+    flush_pending()
+    return {'imported': imported, 'skipped': skipped}
+
+def load_manifest(path: pathlib.Path) -> dict:
+    """Read and validate a launcher manifest; returns {'name', 'launchers': [spec, ...]} with every spec resolved.
+
+    A manifest is JSON: {"version": 1, "name": "team-tools", "launchers": [{"name": ..., "target": ...,
+    "wrapper": "Auto", "args": "", "icon": "", "categories": "", "terminal": false, "comment": "", "id": ...}]}.
+    Relative targets and icon files are taken relative to the manifest. Raises ValueError on invalid input.
+    """
+    raw = json.loads(pathlib.Path(path).read_text(encoding='utf-8'))
+    if not isinstance(raw, dict) or raw.get('version') != MANIFEST_VERSION:
+        raise ValueError(f"Unsupported manifest version {raw.get('version') if isinstance(raw, dict) else None}")
+    base = pathlib.Path(path).expanduser().resolve().parent
+    name = raw.get('name') or 'default'
+    specs = []; ids = set()
+    for i, item in enumerate(raw.get('launchers', [])):
+        spec = manifest_spec(item, base)
+        if spec['id'] in ids:
+            raise ValueError(f"launchers[{i}]: desktop ID {spec['id']} used twice")
+        ids.add(spec['id']); specs.append(spec)
+    return {'name': name, 'launchers': specs}
+
+def manifest_spec(item: dict, base: pathlib.Path) -> dict:
+    """Desired state of one manifest launcher: desktop ID, MANIFEST_FIELDS values and the icon file to store."""
+    def local(p: str) -> str:
+        p = os.path.expanduser(p)
+        return p if os.path.isabs(p) else str(base / p)
+    if not item.get('name') or not item.get('target'):
+        raise ValueError(f'Manifest launcher needs name and target: {item}')
+    wrapper = item.get('wrapper', 'Auto')
+    if wrapper not in WRAPPERS:
+        raise ValueError(f"Unknown wrapper {wrapper!r} (one of {', '.join(WRAPPERS)})")
+    target = local(item['target'])
+    icon = icon_file = item.get('icon', '')
+    if icon and ('/' in icon or icon.startswith('~') or os.path.splitext(icon)[1].lower() in ('.png', '.svg', '.xpm', '.jpg', '.jpeg')):
+        icon_file = local(icon)
+        try: icon = ICON_STORE.name_for(pathlib.Path(icon_file).read_bytes())
+        except OSError as e: raise ValueError(f'Icon not readable: {icon_file} ({e.strerror})')
+    categories = item.get('categories', '')
+    if categories and not categories.endswith(';'): categories += ';'
+    stem = item.get('id') or sanitize_name(item['name'])
+    desktop_id = pathlib.Path(stem if stem.endswith('.desktop') else stem + '.desktop').name
+    fields = {'Name': item['name'], 'Exec': build_exec_command(target, wrapper, item.get('args', '')),
+              'Comment': item.get('comment', ''), 'Icon': icon, 'Categories': categories,
+              'Terminal': 'true' if item.get('terminal') else 'false'}
+    return {'id': desktop_id, 'fields': fields, 'icon_file': icon_file, 'target': target,
+            'executable': item.get('executable', wrapper == 'Direct' or (wrapper == 'Auto' and auto_wrapper(target) == 'Direct'))}
+
+def _fields_digest(fields: dict) -> str:
+    import hashlib
+    return hashlib.sha256(json.dumps([fields.get(k, '') for k in MANIFEST_FIELDS]).encode('utf-8')).hexdigest()[:16]
+
+def _current_fields(entry: DesktopEntry) -> dict:
+    header = entry.full()  # Comment is not kept in memory
+    fields = {k: header.get(k, '') for k in MANIFEST_FIELDS}
+    icon = fields['Icon']
+    if os.path.isabs(icon) and pathlib.Path(icon).parent == ICON_DIR and pathlib.Path(icon).stem.startswith(ICON_PREFIX):
+        fields['Icon'] = pathlib.Path(icon).stem  # stored copy kept as a path (no image conversion available)
+    fields['Terminal'] = 'true' if fields['Terminal'].lower() == 'true' else 'false'
+    return fields
+
+def plan_manifest(manifest: dict, prune: bool = True) -> list[dict]:
+    """Diff a loaded manifest against LOCAL_APPS by content hash of the managed fields; reads headers only.
+
+    Actions: create, update (with the changed fields), remove (launchers this manifest owns that it no longer
+    lists; only with prune), unchanged, and conflict (the desktop ID exists but is not owned by this manifest).
+    """
+    name = manifest['name']; plan = []
+    for spec in manifest['launchers']:
+        path = LOCAL_APPS / spec['id']
+        entry = ENTRY_CACHE.get(path)
+        if entry is None:
+            plan.append({'action': 'create', 'id': spec['id'], 'fields': spec['fields']}); continue
+        owner = entry.data.get(MANIFEST_MARKER_KEY)
+        if owner != name:
+            plan.append({'action': 'conflict', 'id': spec['id'],
+                         'reason': f'owned by manifest {owner!r}' if owner else 'exists and is not managed by a manifest'}); continue
+        current = _current_fields(entry)
+        if _fields_digest(current) == _fields_digest(spec['fields']):
+            plan.append({'action': 'unchanged', 'id': spec['id']}); continue
+        plan.append({'action': 'update', 'id': spec['id'],
+                     'changes': {k: [current[k], v] for k, v in spec['fields'].items() if current[k] != v}})
+    if prune:
+        wanted = {spec['id'] for spec in manifest['launchers']}
+        for entry in ENTRY_CACHE.scan(LOCAL_APPS):
+            if entry.data.get(MANIFEST_MARKER_KEY) == name and entry.path.name not in wanted:
+                plan.append({'action': 'remove', 'id': entry.path.name})
+    return plan
+
+def apply_manifest(manifest: dict, dry_run: bool = False, prune: bool = True, index: Optional[LauncherIndex] = None) -> list[dict]:
+    """Bring LOCAL_APPS in line with a loaded manifest, writing only what differs, in one transaction.
+
+    Returns the plan (see plan_manifest); with dry_run nothing is written. An apply with nothing to change
+    touches no file, so the desktop database is not refreshed either.
+    """
+    plan = plan_manifest(manifest, prune)
+    if dry_run: return plan
+    specs = {spec['id']: spec for spec in manifest['launchers']}
+    changed = []
+    with Transaction():
+        for step in plan:
+            path = LOCAL_APPS / step['id']
+            if step['action'] == 'remove':
+                remove_entry(DesktopEntry(path)); changed.append(step['id'])
+            elif step['action'] in ('create', 'update'):
+                spec = specs[step['id']]; f = spec['fields']
+                doc = DesktopFile.load(path) if step['action'] == 'update' else DesktopFile()
+                _apply_fields(doc, f['Name'], f['Exec'], f['Comment'], spec['icon_file'], f['Categories'], f['Terminal'] == 'true')
+                doc.set(MANIFEST_MARKER_KEY, manifest['name'])
+                doc.save(path); changed.append(step['id'])
+        for spec in manifest['launchers']:
+            # Only chmod what needs it: a no-op apply must not touch the targets either
+            if spec['executable'] and os.path.isfile(spec['target']) and not os.access(spec['target'], os.X_OK):
+                try: make_executable(spec['target'])
+                except OSError as e: print('chmod error', spec['target'], e)
+    if index is not None:
+        for desktop_id in changed: index.refresh(desktop_id)
+    return plan
+
+def entry_json(rec: OverlayRecord) -> dict:
+    e = rec.entry
+    return {
+        'id': rec.desktop_id, 'name': e.display_name(), 'path': str(rec.path),
+        'exec': e.data.get('Exec', ''), 'icon': e.icon_name() or '', 'categories': e.data.get('Categories', ''),
+        'custom': e.is_custom(), 'hidden': e.is_hidden(), 'override': rec.is_override(),
+        'orphaned': rec.is_orphaned(), 'shadows': [str(p) for p in rec.shadows],
+    }
@@ -0,0 +1,40 @@
+"""Regression tests for commands forwarded to a running window (launcher_cli.main_from_gui)."""
+import os, pathlib, sys, tempfile, unittest
+from unittest import mock
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+import launcher_cli
+
+class ForwardTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory(); self.addCleanup(self.tmp.cleanup)
+        cwd = os.getcwd(); os.chdir(self.tmp.name); self.addCleanup(os.chdir, cwd)
+        self.cwd = os.getcwd()
+
+    def forwarded(self, argv: list[str]) -> list[str]:
+        with mock.patch.object(launcher_cli, 'forward_to_instance', return_value=0) as forward:
+            self.assertEqual(launcher_cli.main_from_gui(argv), 0)
+        return forward.call_args.args[0]
+
+    def test_export_destination_that_does_not_exist_yet_is_made_absolute(self):
+        self.assertEqual(self.forwarded(['--export', 'out.tar.gz']), ['--export', os.path.join(self.cwd, 'out.tar.gz')])
+
+    def test_option_values_are_left_alone(self):
+        pathlib.Path('tool.sh').write_text('#!/bin/sh\n')
+        self.assertEqual(self.forwarded(['--add', 'tool.sh', '--name', 'Tool', '--icon', 'utilities-terminal']),
+                         ['--add', os.path.join(self.cwd, 'tool.sh'), '--name', 'Tool', '--icon', 'utilities-terminal'])
+
+    def test_profiled_commands_run_here(self):
+        with mock.patch.object(launcher_cli, 'forward_to_instance') as forward, \
+             mock.patch.object(launcher_cli, 'main', return_value=0) as main:
+            self.assertEqual(launcher_cli.main_from_gui(['--list', '--profile']), 0)
+        forward.assert_not_called(); main.assert_called_once_with(['list', '--profile'])
+
+    def test_running_window_refuses_profile(self):
+        enabled = launcher_cli.core.PROFILE.enabled
+        status, out, err = launcher_cli.capture(['list', '--profile', 'x.jsonl'], forwarded=True)
+        self.assertEqual(status, 2); self.assertIn('--profile', err)
+        self.assertEqual(launcher_cli.core.PROFILE.enabled, enabled)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+"""Regression tests for duplicate detection (launcher_core.canonical_exec / find_duplicates)."""
+import pathlib, sys, tempfile, unittest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+import launcher_core as core
+
+def record(desktop_id: str, exec_cmd: str) -> core.OverlayRecord:
+    rec = core.OverlayRecord(desktop_id, pathlib.Path('/usr/share/applications') / desktop_id)
+    rec.entry = core.DesktopEntry(rec.path, {'Name': desktop_id, 'Type': 'Application', 'Exec': exec_cmd})
+    return rec
+
+class CanonicalExecTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory(); self.addCleanup(self.tmp.cleanup)
+        root = pathlib.Path(self.tmp.name)
+        self.binary = root / 'usr/bin/snap'; self.binary.parent.mkdir(parents=True)
+        self.binary.write_text('#!/bin/sh\n'); self.binary.chmod(0o755)
+        self.links = root / 'snap/bin'; self.links.mkdir(parents=True)
+        for name in ('firefox', 'thunderbird'): (self.links / name).symlink_to(self.binary)
+
+    def test_symlinks_to_one_binary_under_other_names_are_not_duplicates(self):
+        # Snap wrappers (and busybox applets, view -> vim) pick their behaviour from argv[0]
+        records = [record('firefox_firefox.desktop', f'{self.links}/firefox %u'),
+                   record('thunderbird_thunderbird.desktop', f'{self.links}/thunderbird %u')]
+        self.assertEqual(core.find_duplicates(records), [])
+
+    def test_same_invoked_name_is_still_a_duplicate(self):
+        resolved = {}
+        self.assertEqual(core.canonical_exec(f'{self.links}/firefox %u', resolved),
+                         core.canonical_exec(f"'{self.links}/firefox' %U", resolved))
+        records = [record('a.desktop', f'{self.links}/firefox %u'), record('b.desktop', f'{self.links}/firefox')]
+        self.assertEqual([[r.desktop_id for r in g] for g in core.find_duplicates(records)], [['a.desktop', 'b.desktop']])
+
+    def test_link_with_the_binary_name_collapses(self):
+        alias = pathlib.Path(self.tmp.name) / 'bin'; alias.symlink_to(self.binary.parent)
+        self.assertEqual(core.canonical_exec(f'{alias}/snap run x'), core.canonical_exec(f'{self.binary} run x'))
+
+if __name__ == '__main__':
+    unittest.main()
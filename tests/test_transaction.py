@@ -0,0 +1,83 @@
+"""Regression tests for launcher_core.Transaction rollback, nested blocks included."""
+import pathlib, sys, tempfile, unittest
+from unittest import mock
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+import launcher_core as core
+
+class TransactionTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory(); self.addCleanup(self.tmp.cleanup)
+        self.root = pathlib.Path(self.tmp.name)
+        self.kept = self.root / 'kept.desktop'; self.kept.write_text('old\n')
+
+    def test_failed_block_restores_every_file(self):
+        new = self.root / 'new.desktop'
+        with self.assertRaises(RuntimeError):
+            with core.Transaction():
+                core.write_file(self.kept, 'changed\n'); core.write_file(new, 'new\n')
+                raise RuntimeError
+        self.assertEqual(self.kept.read_text(), 'old\n')
+        self.assertFalse(new.exists())
+
+    def test_inner_failure_caught_by_outer_block_undoes_only_the_inner_writes(self):
+        inner = self.root / 'inner.desktop'; other = self.root / 'other.desktop'; other.write_text('old\n')
+        with core.Transaction() as txn:
+            txn.write(self.kept, 'outer\n')
+            try:
+                with core.Transaction():
+                    core.write_file(inner, 'inner\n'); core.write_file(other, 'inner\n')
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            core.write_file(other, 'after\n')  # touched again after the savepoint: still undoable
+        self.assertEqual(self.kept.read_text(), 'outer\n')
+        self.assertFalse(inner.exists())
+        self.assertEqual(other.read_text(), 'after\n')
+        self.assertEqual([path for path, _ in txn.undo], [self.kept, other])
+
+    def test_inner_failure_restores_a_file_the_outer_block_already_wrote(self):
+        with core.Transaction() as txn:
+            txn.write(self.kept, 'outer\n')
+            try:
+                with core.Transaction():
+                    core.write_file(self.kept, 'inner\n')
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            self.assertEqual(self.kept.read_text(), 'outer\n')
+        self.assertEqual(self.kept.read_text(), 'outer\n')
+
+    def test_outer_failure_after_nested_overwrite_restores_the_original(self):
+        with self.assertRaises(RuntimeError):
+            with core.Transaction():
+                core.write_file(self.kept, 'outer\n')
+                with core.Transaction():
+                    core.write_file(self.kept, 'inner\n')
+                raise RuntimeError
+        self.assertEqual(self.kept.read_text(), 'old\n')
+
+    def test_outer_failure_also_undoes_committed_inner_writes(self):
+        inner = self.root / 'inner.desktop'
+        with self.assertRaises(RuntimeError):
+            with core.Transaction():
+                with core.Transaction():
+                    core.write_file(inner, 'inner\n')
+                raise RuntimeError
+        self.assertFalse(inner.exists())
+
+    def test_icons_stored_in_a_failed_block_are_removed_and_not_flushed(self):
+        store = core.ICON_STORE
+        with mock.patch.object(store, 'root', self.root / 'hicolor'), mock.patch.object(store, 'dirty', False):
+            with self.assertRaises(RuntimeError):
+                with core.Transaction():
+                    name = store.store_bytes(b'<svg/>', '.svg')
+                    self.assertTrue(store.files(name))
+                    raise RuntimeError
+            self.assertEqual(store.files(name), [])
+            self.assertFalse(store.dirty)
+            self.assertEqual(store.store_bytes(b'<svg/>', '.svg'), name)
+            self.assertTrue(store.dirty)
+
+if __name__ == '__main__':
+    unittest.main()